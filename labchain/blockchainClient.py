@@ -541,7 +541,7 @@ class BlockchainClient:
         clear_screen()
         public_key = input('Please enter a sender address: ')
         try:
-            transactions = self.network_interface.requestTransactionReceived(public_key)
+            transactions = self.network_interface.requestTransactionSent(public_key)
         except TransactionDoesNotExistException:
             transactions = None
 
@@ -567,16 +567,14 @@ class BlockchainClient:
         """Prompt the user for a transaction hash and display the transaction details."""
         clear_screen()
         try:
-            transactions = self.network_interface.requestTransactionReceived("public_key")
+            # transactions are requested page by page while printing
+            for transaction in self.network_interface.iterAllTransactions():
+                print('Sender ID: {}'.format(transaction.sender))
+                print('Receiver ID: {}'.format(transaction.receiver))
+                print('Payload: {}'.format(transaction.payload))
+                print('Signature: {}'.format(transaction.signature))
+                print()
         except TransactionDoesNotExistException:
-            transactions = None
-
-        clear_screen()
-        for transaction in transactions:
-            print('Sender ID: {}'.format(transaction.sender))
-            print('Receiver ID: {}'.format(transaction.receiver))
-            print('Payload: {}'.format(transaction.payload))
-            print('Signature: {}'.format(transaction.signature))
-            print()
+            pass
         # wait for any input before returning to menu
         input('Press enter to continue...')
@@ -19,6 +19,10 @@ from labchain.network.networking import JsonRpcClient
 from labchain.network.networking import ServerNetworkInterface, NoPeersException
 from labchain.datastructure.txpool import TxPool
 from labchain.databaseInterface import Db
+from labchain.util.snapshotFile import SnapshotFile
+from labchain.util.admissionPipeline import AdmissionPipeline
+from labchain.util.verificationCache import VerificationCache, DEFAULT_CACHE_SIZE
+from labchain.util.verificationEngine import VerificationEngine
 
 
 class BlockChainNode:
@@ -51,8 +55,18 @@ class BlockChainNode:
         initial_peers : Networking module configured with initial neighbour peers
         config_reader : Instance of the ConfigReader module
         db : DB instance for saving the blockchain data to disk
+        snapshot_file : SnapshotFile the chain state is periodically written to
+        snapshot_thread : Thread which periodically writes the chain snapshot
+        verification_engine : Instance of VerificationEngine verifying the
+            signatures of new blocks and transactions
+        admission_pipeline : Instance of AdmissionPipeline admitting the
+            received transactions in batches
         logger : Instane of logging
         rb_thread : Thread which polls in intervals for blocks requested
+        mining_template : Block being mined, new transactions are added to
+            it until it is full
+        mining_template_size : Maximum number of transactions in a block
+        mining_template_lock : Lock guarding the mining template
 
         """
         self.consensus_obj = None
@@ -61,6 +75,10 @@ class BlockChainNode:
         self.txpool_obj = None
         self.mine_thread = None
         self.orphan_killer = None
+        self.snapshot_file = None
+        self.snapshot_thread = None
+        self.verification_engine = None
+        self.admission_pipeline = None
         self.network_interface = None
         self.webserver_thread = None
         self.polling_thread = None
@@ -70,6 +88,9 @@ class BlockChainNode:
         self.db = None
         self.logger = logging.getLogger(__name__)
         self.rb_thread = None
+        self.mining_template = None
+        self.mining_template_size = 0
+        self.mining_template_lock = threading.Lock()
         try:
             self.config_reader = ConfigReader(config_file_path)
             self.logger.debug("Read config file successfully!")
@@ -80,6 +101,14 @@ class BlockChainNode:
 
         self.initialize_components()
 
+    def stop(self):
+        """Stops admitting transactions and the signature verification
+        workers"""
+        if self.admission_pipeline is not None:
+            self.admission_pipeline.stop()
+        if self.verification_engine is not None:
+            self.verification_engine.shutdown()
+
     def fetch_prev_blocks(self, q, interval):
         """Fetch the blocks requested at regular intervals, and try to
         add them to the blockchain.
@@ -104,6 +133,14 @@ class BlockChainNode:
                         "Error getting block from neighbour " + str(e))
             time.sleep(interval)
 
+    def schedule_snapshots(self, interval):
+        """Write a snapshot of the chain state at interval defined"""
+        while True:
+            time.sleep(interval)
+            if self.snapshot_file.save(self.blockchain_obj.dump_state()):
+                self.logger.debug("Wrote chain snapshot to {}"
+                                  .format(self.snapshot_file.path))
+
     def schedule_orphans_killing(self, interval):
         """Kill orphan blocks at interval defined"""
         while True:
@@ -123,20 +160,35 @@ class BlockChainNode:
             Maximum number of transactions to put in a block
         """
         next_call = time.time()
+        self.mining_template_size = block_transactions_size
         while True:
             # check the last call of mine from consensus component
             if next_call - self.consensus_obj.last_mine_time_sec >= mine_freq:
-                transactions = self.txpool_obj.get_transactions(
+                # take the senders in turn, so none of them fills the block
+                transactions = self.txpool_obj.get_transactions_round_robin(
                     block_transactions_size)
                 block = self.blockchain_obj.create_block(transactions)
                 self.blockchain_obj.active_mine_block_update(block)
+                with self.mining_template_lock:
+                    self.mining_template = block
                 _timestamp2, _timestamp1, _num_of_blocks, _difficulty = self.blockchain_obj.calculate_diff(
                     block.predecessor_hash)
                 self.logger.debug("Created new block, try to mine")
                 st = time.time()
 
-                if self.consensus_obj.mine(block, _timestamp2, _timestamp1,
-                                           _num_of_blocks, _difficulty):
+                while True:
+                    mined = self.consensus_obj.mine(block, _timestamp2, _timestamp1,
+                                                    _num_of_blocks, _difficulty)
+                    with self.mining_template_lock:
+                        # the block may have been topped up after the nonce
+                        # was found, then the nonce no longer matches its root
+                        if not mined or self.consensus_obj.validate(
+                                block, _timestamp2, _timestamp1,
+                                _num_of_blocks, _difficulty):
+                            self.mining_template = None
+                            break
+                    self.logger.debug("Block was topped up while mined, mine again")
+                if mined:
                     # have to check if other node already created a block
                     self.logger.debug("Mining was successful for new block")
                     if self.blockchain_obj.add_block(block):
@@ -168,17 +220,85 @@ class BlockChainNode:
         """Retrieve a list of n last mined transactions from the blockchain"""
         return self.blockchain_obj.get_n_last_transactions(n)
 
-    def on_get_all_transactions(self, transaction_hash):
+    def on_get_all_transactions(self):
         """Retrieve all transaction from the blockchain"""
         transaction_tuple = self.blockchain_obj.get_all_transactions()
         return transaction_tuple
 
+    def on_get_transactions_page(self, cursor=None, limit=100):
+        """Retrieve a page of the transactions from the blockchain"""
+        return self.blockchain_obj.get_transactions_page(cursor, limit)
+
+    def on_get_received_transactions(self, public_key, offset=0, limit=None):
+        """Retrieve a page of the transactions received by an address"""
+        return self.blockchain_obj.get_transactions_by_receiver(
+            public_key, offset, limit)
+
+    def on_get_sent_transactions(self, public_key, offset=0, limit=None):
+        """Retrieve a page of the transactions sent by an address"""
+        return self.blockchain_obj.get_transactions_by_sender(
+            public_key, offset, limit)
+
+    def on_get_merkle_proof(self, transaction_hash):
+        """Retrieve the inclusion proof of a transaction in the blockchain"""
+        return self.blockchain_obj.get_merkle_proof(transaction_hash)
+
     def on_get_transactions_in_txpool(self):
         return self.txpool_obj.get_transactions(self.txpool_obj.get_transaction_count(), False)
 
     def on_new_transaction_received(self, transaction):
         """Callback method to pass to network"""
-        return self.txpool_obj.add_transaction_if_not_exist(transaction)
+        added = self.txpool_obj.add_transaction_if_not_exist(transaction)
+        if added:
+            self.top_up_mining_template()
+        return added
+
+    def on_new_transactions_batch(self, transactions):
+        """Callback of the admission pipeline, adds the transactions to the
+        pool with their signatures verified together. Returns the
+        transactions added"""
+        added = self.txpool_obj.add_transactions(transactions,
+                                                 self.verification_engine)
+        if added:
+            self.top_up_mining_template()
+        return added
+
+    def broadcast_transactions(self, transactions):
+        """Send the transactions admitted to other nodes in one request.
+        The peers are called from a separate thread, so slow peers do not
+        hold up the admission of further transactions"""
+        threading.Thread(name='Transaction Broadcast',
+                         target=self._send_transactions_safe,
+                         args=(transactions,), daemon=True).start()
+
+    def _send_transactions_safe(self, transactions):
+        try:
+            self.network_interface.sendTransactions(transactions)
+        except NoPeersException:
+            self.logger.debug('{} transactions could not be sent to any peer'
+                              .format(len(transactions)))
+        except Exception as e:
+            self.logger.error('Could not broadcast {} transactions: {}'
+                              .format(len(transactions), e))
+
+    def top_up_mining_template(self):
+        """Moves transactions from the pool into the block being mined
+        while it is not full. The miner picks up the new Merkle Tree root
+        with its next nonce, and mines again if the block was topped up
+        after its nonce was found.
+        """
+        with self.mining_template_lock:
+            if self.mining_template is None:
+                return
+            free_slots = self.mining_template_size - \
+                len(self.mining_template.transactions)
+            if free_slots <= 0:
+                return
+            transactions = self.txpool_obj.get_transactions_round_robin(free_slots)
+            if transactions:
+                self.mining_template.append_transactions(transactions)
+                self.logger.debug("Added {} transactions to the block being mined"
+                                  .format(len(transactions)))
 
     def on_new_block_received(self, block):
         """Callback method to pass to network, call add block method in block chain"""
@@ -200,6 +320,10 @@ class BlockChainNode:
             return Block.from_json(block_data)
         return None
 
+    def on_get_block_json_by_hash(self, hash):
+        """callback method for get block, returns the serialized block"""
+        return self.blockchain_obj.get_block_by_hash(hash)
+
     def on_get_block_by_id(self, block_id):
         """callback method for get block"""
         return self.blockchain_obj.get_block_by_id(block_id)
@@ -233,12 +357,20 @@ class BlockChainNode:
                                       self.on_get_blocks_by_range,
                                       self.on_get_transactions_in_txpool,
                                       self.on_get_last_n_transactions,
-                                      self.on_get_all_transactions,
-                                      port)
-
-    def reinitialize_blockchain_from_db(self):
-        """Restore DB by fetching entries from Blockchain"""
-        return self.db.get_blockchain_from_db()
+                                      self.on_get_received_transactions,
+                                      port,
+                                      get_transaction_sent_callback=self.on_get_sent_transactions,
+                                      get_all_transactions_callback=self.on_get_all_transactions,
+                                      get_block_json_by_hash_callback=self.on_get_block_json_by_hash,
+                                      get_merkle_proof_callback=self.on_get_merkle_proof,
+                                      get_transactions_page_callback=self.on_get_transactions_page,
+                                      submit_transaction_callback=self.admission_pipeline.submit
+                                      if self.admission_pipeline else None)
+
+    def reinitialize_blockchain_from_db(self, after_block_id=None):
+        """Restore DB by fetching entries from Blockchain, only the blocks
+        with a block id above after_block_id if given"""
+        return self.db.get_blockchain_from_db(after_block_id)
 
     def initialize_components(self):
         """ Initialize every componenent of the node"""
@@ -248,6 +380,8 @@ class BlockChainNode:
         self.txpool_obj = TxPool(crypto_helper_obj=self.crypto_helper_obj)
         self.db = Db(block_chain_db_file=os.path.abspath(os.path.join(
                      os.path.dirname(__file__), 'resources/labchaindb.sqlite')))
+        self.snapshot_file = SnapshotFile(os.path.abspath(os.path.join(
+            os.path.dirname(__file__), 'resources/labchain_snapshot.bin')))
 
         """init blockchain"""
         # Generate the node ID using host ID
@@ -263,6 +397,34 @@ class BlockChainNode:
             pruning_interval = self.config_reader.get_config(
                 section='BLOCK_CHAIN',
                 option='TIME_TO_PRUNE')
+            max_orphan_blocks = self.config_reader.get_config(
+                section='BLOCK_CHAIN',
+                option='MAX_ORPHAN_BLOCKS',
+                fallback=100)
+            finality_depth = self.config_reader.get_config(
+                section='BLOCK_CHAIN',
+                option='FINALITY_DEPTH',
+                fallback=100)
+            verification_workers = self.config_reader.get_config(
+                section='BLOCK_CHAIN',
+                option='VERIFICATION_WORKERS',
+                fallback=os.cpu_count() or 1)
+            min_parallel_verification = self.config_reader.get_config(
+                section='BLOCK_CHAIN',
+                option='MIN_PARALLEL_VERIFICATION',
+                fallback=32)
+            verification_cache_size = self.config_reader.get_config(
+                section='BLOCK_CHAIN',
+                option='VERIFICATION_CACHE_SIZE',
+                fallback=DEFAULT_CACHE_SIZE)
+            recent_transactions_size = self.config_reader.get_config(
+                section='BLOCK_CHAIN',
+                option='RECENT_TRANSACTIONS',
+                fallback=1000)
+            snapshot_interval = self.config_reader.get_config(
+                section='BLOCK_CHAIN',
+                option='SNAPSHOT_INTERVAL',
+                fallback=600)
             fetch_prev_interval = self.config_reader.get_config(
                                   section='BLOCK_CHAIN',
                                   option='FETCH_PREV_INTERVAL')
@@ -275,6 +437,18 @@ class BlockChainNode:
                 option='PEER_LIST')
             pool_interval = self.config_reader.get_config(section='NETWORK',
                                                           option='POOLING_INTERVAL_SEC')
+            admission_batch_size = self.config_reader.get_config(
+                section='NETWORK',
+                option='ADMISSION_BATCH_SIZE',
+                fallback=500)
+            admission_max_delay = self.config_reader.get_config(
+                section='NETWORK',
+                option='ADMISSION_MAX_DELAY_MS',
+                fallback=50)
+            admission_queue_size = self.config_reader.get_config(
+                section='NETWORK',
+                option='ADMISSION_QUEUE_SIZE',
+                fallback=100000)
             mine_freq = self.config_reader.get_config(section='MINING',
                                                       option='MINE_SCHEDULING_FREQUENCY_SEC')
             num_of_transactions = self.config_reader.get_config(
@@ -282,15 +456,36 @@ class BlockChainNode:
                 option='BLOCK_TRANSACTION_SIZE')
             min_blocks = self.config_reader.get_config(section='MINING',
                                                        option='NUM_OF_BLOCKS_FOR_DIFFICULTY')
+            max_pool_transactions = self.config_reader.get_config(
+                section='MINING',
+                option='MAX_POOL_TRANSACTIONS',
+                fallback=100000)
+            max_pool_bytes = self.config_reader.get_config(
+                section='MINING',
+                option='MAX_POOL_BYTES',
+                fallback=64 * 1024 * 1024)
+            max_pool_transactions_per_sender = self.config_reader.get_config(
+                section='MINING',
+                option='MAX_POOL_TRANSACTIONS_PER_SENDER',
+                fallback=1000)
         except ConfigReaderException as e:
             self.logger.error(str(e))
             self.logger.error("Exiting Node startup ..!! \n")
             sys.exit(0)
 
+        VerificationCache.instance().set_max_size(verification_cache_size)
+        self.txpool_obj.set_limits(max_pool_transactions or None,
+                                   max_pool_bytes or None,
+                                   max_pool_transactions_per_sender or None)
+
         # Create tables if not already
         self.db.create_tables()
 
         self.q = Queue()
+        self.verification_engine = VerificationEngine(verification_workers,
+                                                      min_parallel_verification)
+        # start the workers before the threads taking locks are started
+        self.verification_engine.start()
 
         self.blockchain_obj = BlockChain(node_id=node_id,
                                          tolerance_value=tolerance_value,
@@ -300,7 +495,36 @@ class BlockChainNode:
                                          crypto_helper_obj=self.crypto_helper_obj,
                                          min_blocks_for_difficulty=min_blocks,
                                          db=self.db,
-                                         q=self.q)
+                                         q=self.q,
+                                         max_orphan_blocks=max_orphan_blocks,
+                                         finality_depth=finality_depth,
+                                         recent_transactions_size=recent_transactions_size,
+                                         verification_engine=self.verification_engine)
+
+        # restore the chain before any thread can access it
+        self.logger.info("Loading chain snapshot if present...")
+        snapshot = self.snapshot_file.load()
+        after_block_id = None
+        if snapshot is not None and self.blockchain_obj.load_state(snapshot):
+            # blocks saved after the snapshot can only fork off above the
+            # finality checkpoint, the ones below it are in the snapshot
+            after_block_id = self.blockchain_obj.get_finalized_position()
+
+        self.logger.info("Fetching Blocks from Database if present...")
+        blocks_from_db = self.reinitialize_blockchain_from_db(after_block_id)
+        if blocks_from_db is not None:
+            num_of_blocks = self.blockchain_obj.add_blocks(
+                [LogicalBlock.from_block(block, self.consensus_obj)
+                 for block in blocks_from_db], False)
+            self.logger.info(
+                'Fetched ' + str(num_of_blocks) + ' blocks from DB')
+
+        self.admission_pipeline = AdmissionPipeline(self.on_new_transactions_batch,
+                                                    self.broadcast_transactions,
+                                                    batch_size=admission_batch_size,
+                                                    max_delay=admission_max_delay / 1000.0,
+                                                    max_queue_size=admission_queue_size)
+        self.admission_pipeline.start()
 
         self.logger.debug("Initialized web server")
         """init network interface"""
@@ -325,15 +549,6 @@ class BlockChainNode:
                                                args=(pool_interval,))
         self.polling_thread.start()
 
-        self.logger.info("Fetching Blocks from Database if present...")
-        blocks_from_db = self.reinitialize_blockchain_from_db()
-        if blocks_from_db is not None:
-            for block in blocks_from_db:
-                self.blockchain_obj.add_block(
-                    LogicalBlock.from_block(block, self.consensus_obj), False)
-                self.logger.info(
-                    'Fetched block nr ' + str(block.block_id) + ' from DB')
-
         self.logger.info("Starting bootstrap...")
         """Bootstrap the blockchain node"""
         bootstrapper = Bootstrapper(self.network_interface)
@@ -361,3 +576,10 @@ class BlockChainNode:
             kwargs=dict(interval=pruning_interval))
 
         self.orphan_killer.start()
+
+        if snapshot_interval > 0:
+            self.logger.debug("Starting chain snapshot thread...")
+            self.snapshot_thread = threading.Thread(
+                target=self.schedule_snapshots,
+                kwargs=dict(interval=snapshot_interval))
+            self.snapshot_thread.start()
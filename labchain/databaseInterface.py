@@ -105,13 +105,100 @@ class Db:
             self.conn.commit()
             self.conn.close()
         except sqlite3.Error as e:
+            self.conn.rollback()
+            self.conn.close()
             self.logger.error("Error in adding block: " + str(e.args[0]))
             return False
         return True
 
-    def get_blockchain_from_db(self):
+    def save_blocks(self, blocks):
+        """Saves several blocks and their transactions in a single
+        database transaction
+
+        Parameters
+        ----------
+        blocks: list of block objects to be saved in database
+
+        Returns
+        -------
+        True if all blocks saved successfully, False otherwise and
+        none of them is saved
+        """
+        self.open_connection(self.db_file)
+        insert_into_blockchain = "INSERT INTO {} (hash, block_id, block_creator_id, " \
+             "merkle_tree_root, predecessor_hash, nonce, ts, difficulty) " \
+             "VALUES (?,?,?,?,?,?,?,?)".format(self.blockchain_table)
+        insert_into_transactions = "INSERT INTO {} (sender, receiver, " \
+            "payload, signature, transaction_hash, block_hash) " \
+            "VALUES (?,?,?,?,?,?)".format(self.transaction_table)
+        block_rows = []
+        transaction_rows = []
+        for block in blocks:
+            block_hash = block.get_computed_hash()
+            block_rows.append((block_hash, block.block_id, block.block_creator_id,
+                               block.merkle_tree_root, block.predecessor_hash,
+                               block.nonce, block.timestamp, block.difficulty))
+            transaction_rows.extend((t.sender, t.receiver, t.payload, t.signature,
+                                     t.transaction_hash, block_hash)
+                                    for t in block.transactions)
+        try:
+            self.cursor.executemany(insert_into_blockchain, block_rows)
+            self.cursor.executemany(insert_into_transactions, transaction_rows)
+            self.conn.commit()
+            self.conn.close()
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            self.conn.close()
+            self.logger.error("Error in adding blocks: " + str(e.args[0]))
+            return False
+        return True
+
+    def get_block_by_hash(self, block_hash):
+        """Fetch a single block with its transactions from database
+
+        Parameters
+        ----------
+        block_hash: hash of the block to fetch
+
+        Returns
+        -------
+        The block, None if it is not in the database
+        """
+        get_block = "SELECT * FROM {} WHERE hash = ?".format(self.blockchain_table)
+        get_transactions = "SELECT * FROM {} WHERE block_hash = ? " \
+            "ORDER BY rowid".format(self.transaction_table)
+        # use an own connection, this is called from request threads
+        try:
+            conn = sqlite3.connect(self.db_file)
+            cursor = conn.cursor()
+            cursor.execute(get_block, (block_hash,))
+            block_db = cursor.fetchone()
+            if block_db is None:
+                conn.close()
+                return None
+            cursor.execute(get_transactions, (block_hash,))
+            txns = []
+            for txn_db in cursor.fetchall():
+                txn = Transaction(txn_db[0], txn_db[1], txn_db[2], txn_db[3])
+                txn.transaction_hash = txn_db[4]
+                txns.append(txn)
+            conn.close()
+        except sqlite3.Error as e:
+            self.logger.error("Error in fetching block: " + str(e.args[0]))
+            return None
+        return Block(block_id=block_db[1], merkle_tree_root=block_db[2],
+                     predecessor_hash=block_db[3], block_creator_id=block_db[4],
+                     transactions=txns, nonce=block_db[5], timestamp=float(block_db[6]),
+                     difficulty=int(block_db[7]))
+
+    def get_blockchain_from_db(self, after_block_id=None):
         """Fetch all blocks with their transactions from database
 
+        Parameters
+        ----------
+        after_block_id: if given, only the blocks with a higher block id
+            are fetched
+
         Returns
         -------
         List of all blocks
@@ -120,7 +207,10 @@ class Db:
         get_block = "SELECT * from {}".format(self.blockchain_table)
         get_transactions = "SELECT * FROM {} WHERE block_hash = ?".format(self.transaction_table)
 
-        self.cursor.execute(get_block)
+        if after_block_id is None:
+            self.cursor.execute(get_block)
+        else:
+            self.cursor.execute(get_block + " WHERE block_id > ?", (after_block_id,))
         blocks = []
         blocks_db = self.cursor.fetchall()
         if len(blocks_db) == 0:
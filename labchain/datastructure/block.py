@@ -1,14 +1,21 @@
-from hashlib import sha256 as sha
+import copy
 import json
 import logging
 from pprint import pformat
 import time
 
 from labchain.util.cryptoHelper import CryptoHelper
+from labchain.util.utility import Utility
+from labchain.datastructure.merkle import MerkleAccumulator, MerkleTree
 from labchain.datastructure.transaction import Transaction
 
 
 class Block(object):
+    __slots__ = ('_block_id', '_timestamp', '_transactions', '_merkle_tree_root',
+                 '_predecessor_hash', '_nonce', '_block_creator_id', '_difficulty')
+
+    _logger = logging.getLogger(__name__)
+
     def __init__(self, block_id=None, merkle_tree_root=None,
                  predecessor_hash=None, block_creator_id=None,
                  transactions=[], nonce=0, timestamp=time.time(),
@@ -35,18 +42,17 @@ class Block(object):
 
         Attributes
         ----------
-        Same as the parameters
+        Same as the parameters, hashes are stored as bytes
 
         """
         self._block_id = block_id
         self._timestamp = timestamp
         self._transactions = transactions
-        self._merkle_tree_root = merkle_tree_root
-        self._predecessor_hash = predecessor_hash
+        self._merkle_tree_root = Utility.pack_hash(merkle_tree_root)
+        self._predecessor_hash = Utility.pack_hash(predecessor_hash)
         self._nonce = nonce
         self._block_creator_id = block_creator_id
         self._difficulty = difficulty
-        self._logger = logging.getLogger(__name__)
 
     def to_dict(self):
         """Returns block data as a dictionary."""
@@ -54,8 +60,8 @@ class Block(object):
             return {
                 'nr': self._block_id,
                 'timestamp': self._timestamp,
-                'merkleHash': self._merkle_tree_root,
-                'predecessorBlock': self._predecessor_hash,
+                'merkleHash': self.merkle_tree_root,
+                'predecessorBlock': self.predecessor_hash,
                 'nonce': self._nonce,
                 'creator': self._block_creator_id,
                 'transactions': [],
@@ -72,8 +78,8 @@ class Block(object):
         return {
             'nr': self._block_id,
             'timestamp': self._timestamp,
-            'merkleHash': self._merkle_tree_root,
-            'predecessorBlock': self._predecessor_hash,
+            'merkleHash': self.merkle_tree_root,
+            'predecessorBlock': self.predecessor_hash,
             'nonce': self._nonce,
             'creator': self._block_creator_id,
             'transactions': t,
@@ -83,8 +89,8 @@ class Block(object):
     def to_json_headers(self):
         """Returns block headers data as JSON"""
         return json.dumps({'nr': self._block_id,
-                           'merkleHash': self._merkle_tree_root,
-                           'predecessorBlock': self._predecessor_hash,
+                           'merkleHash': self.merkle_tree_root,
+                           'predecessorBlock': self.predecessor_hash,
                            'nonce': self._nonce,
                            'creator': self._block_creator_id,
                            'difficulty': self._difficulty})
@@ -122,11 +128,11 @@ class Block(object):
 
     @property
     def merkle_tree_root(self):
-        return self._merkle_tree_root
+        return Utility.unpack_hash(self._merkle_tree_root)
 
     @property
     def predecessor_hash(self):
-        return self._predecessor_hash
+        return Utility.unpack_hash(self._predecessor_hash)
 
     @property
     def block_creator_id(self):
@@ -167,8 +173,8 @@ class Block(object):
             return all([self._block_id == other.block_id,
                         self._timestamp == other.timestamp,
                         self._transactions == other.transactions,
-                        self._merkle_tree_root == other.merkle_tree_root,
-                        self._predecessor_hash == other.predecessor_hash,
+                        self.merkle_tree_root == other.merkle_tree_root,
+                        self.predecessor_hash == other.predecessor_hash,
                         self._nonce == other.nonce,
                         self._block_creator_id == other.block_creator_id,
                         self._difficulty == other._difficulty])
@@ -190,6 +196,19 @@ class Block(object):
 
 
 class LogicalBlock(Block):
+    __slots__ = ('_position_in_chain', '_computed_hash', '_chain_work',
+                 '_body_dropped', '_merkle_tree', '_merkle_accumulator',
+                 '_skip_hash', '_difficulty_window', '_consensus')
+
+    # Counters of the header hash cache shared by all instances
+    _hash_cache_hits = 0
+    _hash_cache_misses = 0
+
+    @property
+    def _crypto_helper(self):
+        # looked up on use, not bound when the module is imported
+        return CryptoHelper.instance()
+
     def __init__(self, block_id=None, transactions=[], predecessor_hash=None,
                  block_creator_id=None, merkle_tree_root=None, nonce=0,
                  timestamp=time.time(), consensus_obj=None, difficulty=-1):
@@ -219,10 +238,26 @@ class LogicalBlock(Block):
         ----------
         _position_in_chain : Int
             Position at which it resides in the node's chain
-        _crypto_helper : Instance of the Crypto Helper Module
         _merkle_tree_root : Hash
             Merkle Tree Root of all transactions combined
         _consensus : Instance of consensus module
+        _computed_hash : Hash
+            Cached hash of the block headers, None if not computed yet
+        _chain_work : Int
+            Cumulative work of the branch ending at this block
+        _skip_hash : Hash
+            Hash of an earlier ancestor of this block used to skip through
+            the chain, set by the blockchain
+        _body_dropped : Boolean
+            True if the transactions were dropped from memory
+        _merkle_tree : MerkleTree
+            Merkle Tree of the transactions, None if not built yet
+        _merkle_accumulator : MerkleAccumulator
+            Accumulator of the transaction hashes, used when transactions
+            are appended, None if not built yet
+        _difficulty_window : DifficultyWindow
+            Summary of the blocks used for the difficulty calculation of
+            this block's successor, set by the blockchain
 
         """
         super(LogicalBlock, self).__init__(block_id=block_id,
@@ -234,10 +269,16 @@ class LogicalBlock(Block):
                                            timestamp=timestamp,
                                            difficulty=difficulty)
         self._position_in_chain = None
-        self._crypto_helper = CryptoHelper.instance()
+        self._computed_hash = None
+        self._chain_work = 0
+        self._body_dropped = False
+        self._merkle_tree = None
+        self._merkle_accumulator = None
+        self._skip_hash = None
+        self._difficulty_window = None
         self._consensus = consensus_obj
         if not self._merkle_tree_root:
-            self._merkle_tree_root = self.compute_merkle_root()
+            self._merkle_tree_root = Utility.pack_hash(self.compute_merkle_root())
 
     def is_block_ours(self, node_id):
         """Checks to see if the block was created by the node ID specified
@@ -254,9 +295,103 @@ class LogicalBlock(Block):
         """Sets the position at which block will reside in chain"""
         self._position_in_chain = value
 
+    def get_chain_work(self):
+        """Returns the cumulative work of the branch ending at this block"""
+        return self._chain_work
+
+    def set_chain_work(self, value):
+        """Sets the cumulative work of the branch ending at this block"""
+        self._chain_work = value
+
+    def get_skip_hash(self):
+        """Returns the hash of the skip pointer ancestor of this block"""
+        return Utility.unpack_hash(self._skip_hash)
+
+    def set_skip_hash(self, value):
+        """Sets the hash of the skip pointer ancestor of this block"""
+        self._skip_hash = Utility.pack_hash(value)
+
+    def get_difficulty_window(self):
+        """Returns the difficulty window ending at this block"""
+        return self._difficulty_window
+
+    def set_difficulty_window(self, value):
+        """Sets the difficulty window ending at this block"""
+        self._difficulty_window = value
+
+    def has_body(self):
+        """Checks whether the transactions of the block are in memory"""
+        return not self._body_dropped
+
+    def without_body(self):
+        """Returns a copy of the block without its transactions, only the
+        headers are kept. The block itself is left untouched, so readers
+        still holding it keep seeing its transactions.
+        """
+        _header = copy.copy(self)
+        _header._transactions = None
+        _header._merkle_tree = None
+        _header._merkle_accumulator = None
+        _header._body_dropped = True
+        return _header
+
     def get_computed_hash(self):
-        """Gets the hash for the entire block"""
-        return self._crypto_helper.hash(self.to_json_headers())
+        """Gets the hash for the entire block.
+        The hash is cached until one of the mutable header fields changes.
+        """
+        if self._computed_hash is None:
+            LogicalBlock._hash_cache_misses += 1
+            self._computed_hash = Utility.pack_hash(
+                self._crypto_helper.hash(self.to_json_headers()))
+        else:
+            LogicalBlock._hash_cache_hits += 1
+        _computed_hash = self._computed_hash
+        # inlined Utility.unpack_hash, blocks are looked up by this hash
+        return _computed_hash.hex() if type(_computed_hash) is bytes else _computed_hash
+
+    @staticmethod
+    def get_hash_cache_stats():
+        """Returns the hits, misses and hit rate of the header hash cache"""
+        hits = LogicalBlock._hash_cache_hits
+        misses = LogicalBlock._hash_cache_misses
+        total = hits + misses
+        return {'hits': hits,
+                'misses': misses,
+                'hit_rate': float(hits) / total if total else 0.0}
+
+    @Block.timestamp.setter
+    def timestamp(self, timestamp):
+        Block.timestamp.fset(self, timestamp)
+        self._computed_hash = None
+
+    @Block.nonce.setter
+    def nonce(self, nonce):
+        Block.nonce.fset(self, nonce)
+        self._computed_hash = None
+
+    @Block.difficulty.setter
+    def difficulty(self, difficulty):
+        Block.difficulty.fset(self, difficulty)
+        self._computed_hash = None
+
+    def set_consensus(self, consensus_obj):
+        """Sets the consensus module, e.g. after unpickling the block"""
+        self._consensus = consensus_obj
+
+    def __getstate__(self):
+        """Pickles the block without the consensus module and the Merkle
+        trees, which are rebuilt when needed"""
+        state = {name: getattr(self, name)
+                 for cls in (Block, LogicalBlock) for name in cls.__slots__
+                 if hasattr(self, name)}
+        state['_consensus'] = None
+        state['_merkle_tree'] = None
+        state['_merkle_accumulator'] = None
+        return state
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
 
     @staticmethod
     def from_block(block, consensus_obj):
@@ -291,13 +426,22 @@ class LogicalBlock(Block):
         return Block.from_json(super(LogicalBlock, self).get_json())
 
     def validate_block(self, _latest_timestamp, _earliest_timestamp,
-                       _num_of_blocks, _prev_difficulty):
+                       _num_of_blocks, _prev_difficulty,
+                       verification_engine=None, signatures_verified=False):
         """Validate the block by checking -
            1. The transaction signatures in the block
            2. The Merkle Tree correctness
            3. The Block Hash with given Nonce to see if it
               satisfies the configured number of zeroes.
 
+        Parameters
+        ----------
+        verification_engine : VerificationEngine
+            Engine verifying the signatures in parallel, if None they are
+            verified in the calling thread
+        signatures_verified : Boolean
+            True to skip check 1, if the signatures were verified already
+
         Returns
         -------
         Integer
@@ -309,16 +453,21 @@ class LogicalBlock(Block):
 
         # Validate Transaction signatures
         transactions = self._transactions
-        if transactions is not None:
-            for t in transactions:
-                if not t.validate_transaction(self._crypto_helper):
+        if transactions is not None and not signatures_verified:
+            if verification_engine is not None:
+                results = verification_engine.verify_transactions(transactions)
+            else:
+                results = (t.validate_transaction(self._crypto_helper)
+                           for t in transactions)
+            for t, valid in zip(transactions, results):
+                if not valid:
                     self._logger.debug('Invalid transaction: {}'.format(t))
                     return -1
 
         # Validate Merkle Tree correctness
-        if self.compute_merkle_root() != self._merkle_tree_root:
+        if self.compute_merkle_root() != self.merkle_tree_root:
             self._logger.debug('Invalid merkle root: {}'
-                               .format(self._merkle_tree_root))
+                               .format(self.merkle_tree_root))
             return -2
 
         #  validate nonce
@@ -332,7 +481,7 @@ class LogicalBlock(Block):
         return 0
 
     def compute_merkle_root(self):
-        """Computes the hashes of all transaction and calls _merkle_root
+        """Computes the Merkle Tree root of the transactions
 
         Returns
         -------
@@ -341,42 +490,31 @@ class LogicalBlock(Block):
             if no transactions present then return None
 
         """
-
-        def _merkle_root(hashes):
-            """Takes 2 transaction's hashes; concatenate them and
-            calculate their hash
-            Recursively do this until 1 hash is left
-
-            Parameters
-            ----------
-            hashes: hashes of transactions
-
-            Returns
-            -------
-            merkle tree root; final hash of all the hashes
-                     or None if param hashes is empty
-
-            """
-            sub_tree = []
-            for i in range(0, len(hashes), 2):
-                # If not the last element
-                if i + 1 < len(hashes):
-                    # Concatenate the hashes and calculate their hash
-                    value = str(hashes[i] + hashes[i + 1]).encode('UTF-8')
-                    hash = sha(value).hexdigest()
-                else:
-                    hash = hashes[i]
-                sub_tree.append(hash)
-            if len(sub_tree) == 0:
-                return None
-            elif len(sub_tree) == 1:
-                return sub_tree[0]
-            else:
-                return _merkle_root(sub_tree)
-
-        txn_hashes = []
-        if self._transactions is None:
+        _merkle_tree = self.get_merkle_tree()
+        if _merkle_tree is None:
             return None
-        for t in self._transactions:
-            txn_hashes.append(self._crypto_helper.hash(t.get_json()))
-        return _merkle_root(txn_hashes)
+        return _merkle_tree.get_root()
+
+    def get_merkle_tree(self):
+        """Returns the Merkle Tree of the transactions, built on first use.
+        None if the transactions are not in memory.
+        """
+        if self._merkle_tree is None and self._transactions is not None:
+            self._merkle_tree = MerkleTree(
+                [self._crypto_helper.hash(t.get_json()) for t in self._transactions])
+        return self._merkle_tree
+
+    def append_transactions(self, transactions):
+        """Appends transactions to the block and updates the Merkle Tree
+        root with logarithmic work per transaction. Used to add new
+        transactions to a block while it is mined.
+        """
+        if self._merkle_accumulator is None:
+            self._merkle_accumulator = MerkleAccumulator(
+                [self._crypto_helper.hash(t.get_json()) for t in self._transactions])
+        for t in transactions:
+            self._merkle_accumulator.append(self._crypto_helper.hash(t.get_json()))
+        self._transactions = self._transactions + list(transactions)
+        self._merkle_tree = None
+        self._merkle_tree_root = Utility.pack_hash(self._merkle_accumulator.get_root())
+        self._computed_hash = None
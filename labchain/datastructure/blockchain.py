@@ -1,16 +1,64 @@
-from datetime import datetime
-import json
+from collections import namedtuple
+import heapq
+import io
 import logging
+import pickle
 import sys
+import threading
 
 from labchain.datastructure.block import LogicalBlock
-from labchain.datastructure.transaction import NoHashError
+from labchain.datastructure.orphanpool import OrphanPool
+from labchain.datastructure.transaction import Transaction
+from labchain.util.lruCache import LRUCache
+from labchain.util.ringBuffer import RingBuffer
+
+
+# Summary of the last blocks of a branch used for difficulty calculation
+# entries holds (timestamp, difficulty) of the blocks in the window,
+# oldest first
+DifficultyWindow = namedtuple('DifficultyWindow',
+                              ['latest_timestamp', 'earliest_timestamp',
+                               'num_of_blocks', 'difficulty_sum', 'entries'])
+
+# Published state of the branch followed by the node. main_chain may grow
+# beyond height after publishing but its first height + 1 entries never
+# change, so readers can use a snapshot without locking.
+ChainSnapshot = namedtuple('ChainSnapshot',
+                           ['head_hash', 'height', 'main_chain'])
+
+
+class _StateUnpickler(pickle.Unpickler):
+    """Unpickler for the state written by BlockChain.dump_state, which
+    only creates the chain classes. A tampered snapshot can not run
+    arbitrary code when it is loaded.
+    """
+    _ALLOWED_CLASSES = {
+        ('labchain.datastructure.block', 'LogicalBlock'): LogicalBlock,
+        ('labchain.datastructure.transaction', 'Transaction'): Transaction,
+        ('labchain.datastructure.blockchain', 'DifficultyWindow'): DifficultyWindow,
+    }
+
+    def find_class(self, module, name):
+        try:
+            return self._ALLOWED_CLASSES[(module, name)]
+        except KeyError:
+            raise pickle.UnpicklingError(
+                "{}.{} is not allowed in a chain state".format(module, name))
 
 
 class BlockChain:
+    # Results of inserting a single block
+    _BLOCK_INVALID = -1
+    _BLOCK_ORPHANED = 0
+    _BLOCK_ADDED = 1
+    # Format of the state written by dump_state
+    _STATE_VERSION = 1
+
     def __init__(self, node_id, tolerance_value, pruning_interval,
                  consensus_obj, txpool_obj, crypto_helper_obj,
-                 min_blocks_for_difficulty, db, q):
+                 min_blocks_for_difficulty, db, q, max_orphan_blocks=100,
+                 block_cache_size=1000, finality_depth=100,
+                 verification_engine=None, recent_transactions_size=1000):
         """Constructor for BlockChain
 
         Parameters
@@ -28,6 +76,19 @@ class BlockChain:
             Minimum blocks used to calculate difficulty
         db : Instance of DB to save all blockchain data
         q : Queue to push requests for missing blocks
+        max_orphan_blocks : Int
+            Maximum number of orphan blocks stored at the same time
+        block_cache_size : Int
+            Maximum number of serialized blocks kept for read requests
+        finality_depth : Int
+            Number of blocks after which a block of the followed branch is
+            final, always larger than the tolerance value
+        verification_engine : VerificationEngine
+            Engine verifying the transaction signatures of new blocks in
+            parallel, None to verify them in the calling thread
+        recent_transactions_size : Int
+            Number of the latest transactions of the followed branch kept
+            for get_n_last_transactions
 
         Attributes
         ----------
@@ -36,16 +97,60 @@ class BlockChain:
         _blockchain : Dictionary
             Dictionary of blocks in our blockchain
             key = block hash, value = LogicalBlock instance
-        _orphan_blocks : Dictionary
-            Dictionary of blocks whose predecessor block is not in our chain
-            key = predecessor block hash, value = LogicalBlock instance
-        _current_branch_heads : List
-            List of the block hashes, which are branch heads maintained by the node
+        _block_id_index : Dictionary
+            Height index of the blocks in our blockchain
+            key = block id, value = set of block hashes with that id
+        _transaction_index : Dictionary
+            Index of the transactions contained in our blockchain
+            key = transaction hash,
+            value = tuple of (block hash, position in block) pairs
+        _sender_index : Dictionary
+            Transactions of our blockchain by sender, in insertion order
+            key = sender address,
+            value = list of (block hash, position in block) pairs
+        _receiver_index : Dictionary
+            Transactions of our blockchain by receiver, in insertion order
+            key = receiver address,
+            value = list of (block hash, position in block) pairs
+        _orphan_blocks : OrphanPool
+            Pool of blocks whose predecessor block is not in our chain
+        _current_branch_heads : Set
+            Set of the block hashes, which are branch heads maintained by the node
+        _branch_heads_heap : List
+            Heap of (-position, -chain work, block hash) of the branch heads,
+            the best head is on top. Entries of hashes which are no longer
+            branch heads are skipped lazily
         _node_branch_head : Hash value
             Hash value of the branch head this node is following
+        _snapshot : ChainSnapshot
+            Latest published state of the followed branch, used by readers
+        _write_lock : RLock
+            Serializes all modifications of the chain. Readers never take
+            it, the structures they use are replaced rather than modified
+            in place
+        _main_chain : List
+            Hashes of the blocks of the branch this node is following,
+            indexed by their position in the chain
+        _recent_transactions : RingBuffer
+            Latest transactions of the followed branch, appended with each
+            new head and rebuilt when the branch is reorganized.
+            The transactions of a block are added in reverse order, so the
+            newest items are the ones of the head block in block order
         _furthest_branching_point : Dictionary
             Information about the point where earliest branching happened in chain
             key = block instance of branching point, value = position in the chain
+        _block_json_cache : LRUCache
+            Cache of the JSON serialization of recently requested blocks
+            key = block hash, value = JSON string
+        _finality_depth : Int
+            Number of blocks after which a block of the followed branch is final
+        _finalized_position : Int
+            Position of the latest final block. Final blocks can not be
+            reorganized and only keep their headers in memory, their
+            transactions are reloaded from the DB when requested
+        _unsaved_blocks : Set
+            Hashes of the blocks which could not be saved to the DB, they
+            keep their transactions in memory
         _tolerance_level : Int
             Length required by the longest chain to be switched to
         _pruning_interval : Int
@@ -60,12 +165,26 @@ class BlockChain:
         self._logger = logging.getLogger(__name__)
         self._node_id = node_id
         self._blockchain = {}
-        self._orphan_blocks = {}
-        self._current_branch_heads = []
+        self._block_id_index = {}
+        self._transaction_index = {}
+        self._sender_index = {}
+        self._receiver_index = {}
+        self._current_branch_heads = set()
+        self._branch_heads_heap = []
         self._node_branch_head = None
+        self._main_chain = []
+        self._recent_transactions = RingBuffer(recent_transactions_size)
+        self._snapshot = None
+        self._write_lock = threading.RLock()
         self._furthest_branching_point = {"block": None, "position": float("inf")}
         self._tolerance_level = tolerance_value
         self._pruning_interval = pruning_interval * 3600
+        self._orphan_blocks = OrphanPool(max_orphan_blocks,
+                                         self._pruning_interval)
+        self._block_json_cache = LRUCache(block_cache_size)
+        self._finality_depth = max(finality_depth, tolerance_value + 1)
+        self._finalized_position = 0
+        self._unsaved_blocks = set()
         self._consensus = consensus_obj
         self._txpool = txpool_obj
         self._crypto_helper = crypto_helper_obj
@@ -73,55 +192,378 @@ class BlockChain:
         self._active_mine_block = None
         self._db = db
         self._q = q
+        self._verification_engine = verification_engine
         # Create the very first Block, add it to Blockchain
         # This should be part of the bootstrap/initial node only
         _first_block = LogicalBlock(block_id=0, timestamp=0)
         _first_block.set_block_pos(0)
         self._first_block_hash = _first_block.get_computed_hash()
-        self._blockchain[self._first_block_hash] = _first_block
+        self._add_to_chain(self._first_block_hash, _first_block)
 
         self._logger.debug("Added Genesis block --- \n {b} \n".
                      format(b=str(_first_block)))
 
         self._node_branch_head = self._first_block_hash
-        self._current_branch_heads = [self._first_block_hash, ]
+        self._main_chain = [self._first_block_hash]
+        self._publish_snapshot()
+        self._current_branch_heads = set()
+        self._add_branch_head(self._first_block_hash, _first_block)
         self._logger.debug("BlockChain initialized with genesis block")
 
+    def _add_to_chain(self, block_hash, block):
+        """Stores the block in the chain and updates all indexes"""
+        _prev_block = self._blockchain.get(block.predecessor_hash)
+        _prev_work = _prev_block.get_chain_work() if _prev_block else 0
+        block.set_chain_work(_prev_work + self._get_block_work(block))
+        if _prev_block:
+            block.set_skip_hash(self._get_ancestor(
+                block.predecessor_hash,
+                self._get_skip_height(block.get_block_pos())))
+        self._blockchain[block_hash] = block
+        self._get_difficulty_window(block)
+        self._block_id_index[block.block_id] = \
+            self._block_id_index.get(block.block_id, frozenset()) | {block_hash}
+        for _pos, _txn in enumerate(block.transactions or []):
+            _txn_hash = self._get_transaction_hash(_txn)
+            _refs = self._transaction_index.get(_txn_hash, ())
+            self._transaction_index[_txn_hash] = _refs + ((block_hash, _pos),)
+            self._sender_index.setdefault(_txn.sender, []).append((block_hash, _pos))
+            self._receiver_index.setdefault(_txn.receiver, []).append((block_hash, _pos))
+
+    def _remove_from_chain(self, block_hash):
+        """Removes the block from the chain and all indexes.
+        Returns the removed block.
+        """
+        block = self._blockchain.pop(block_hash)
+        self._block_json_cache.remove(block_hash)
+        self._unsaved_blocks.discard(block_hash)
+        _hashes = self._block_id_index.get(block.block_id, frozenset()) - {block_hash}
+        if _hashes:
+            self._block_id_index[block.block_id] = _hashes
+        else:
+            self._block_id_index.pop(block.block_id, None)
+        for _txn in block.transactions or []:
+            _txn_hash = _txn.transaction_hash
+            _refs = tuple(_ref for _ref in self._transaction_index.get(_txn_hash, ())
+                          if _ref[0] != block_hash)
+            if _refs:
+                self._transaction_index[_txn_hash] = _refs
+            else:
+                self._transaction_index.pop(_txn_hash, None)
+            self._remove_address_refs(self._sender_index, _txn.sender, block_hash)
+            self._remove_address_refs(self._receiver_index, _txn.receiver, block_hash)
+        return block
+
+    @staticmethod
+    def _remove_address_refs(index, address, block_hash):
+        """Removes the references to a block from an address index entry.
+        The list is replaced rather than modified, so lists handed out
+        to readers stay intact.
+        """
+        _refs = [_ref for _ref in index.get(address, ()) if _ref[0] != block_hash]
+        if _refs:
+            index[address] = _refs
+        else:
+            index.pop(address, None)
+
+    @staticmethod
+    def _get_block_work(block):
+        """Returns the work of a single block, i.e. the expected number of
+        hash attempts needed to mine it"""
+        return 2 ** max(block.difficulty, 0)
+
+    def _add_branch_head(self, block_hash, block):
+        """Registers the block as a branch head"""
+        self._current_branch_heads.add(block_hash)
+        heapq.heappush(self._branch_heads_heap,
+                       (-block.get_block_pos(), -block.get_chain_work(), block_hash))
+        if len(self._branch_heads_heap) > 2 * len(self._current_branch_heads) + 16:
+            # drop the entries of former heads to keep the heap small
+            self._branch_heads_heap = [_entry for _entry in self._branch_heads_heap
+                                       if _entry[2] in self._current_branch_heads]
+            heapq.heapify(self._branch_heads_heap)
+
+    def _remove_branch_head(self, block_hash):
+        """Unregisters the block as a branch head, its heap entry is
+        dropped lazily"""
+        self._current_branch_heads.discard(block_hash)
+
+    def _get_best_branch_head(self):
+        """Returns the hash of the longest branch head, ties are decided by
+        the cumulative work of the branches"""
+        while self._branch_heads_heap[0][2] not in self._current_branch_heads:
+            heapq.heappop(self._branch_heads_heap)
+        return self._branch_heads_heap[0][2]
+
+    @staticmethod
+    def _get_skip_height(position):
+        """Returns the position the skip pointer of a block at the given
+        position points to. Chosen such that ancestor lookups through
+        skip pointers take a logarithmic number of steps.
+        """
+        def _invert_lowest_one(n):
+            return n & (n - 1)
+
+        if position < 2:
+            return 0
+        if position & 1:
+            return _invert_lowest_one(_invert_lowest_one(position - 1)) + 1
+        return _invert_lowest_one(position)
+
+    def _get_ancestor(self, block_hash, position):
+        """Returns the hash of the ancestor of the given block at the given
+        position, None if the position is out of range. Follows the skip
+        pointers, so the lookup is logarithmic in the distance.
+        """
+        _block = self._blockchain[block_hash]
+        if position > _block.get_block_pos() or position < 0:
+            return None
+        _pos = _block.get_block_pos()
+        while _pos > position:
+            _skip_pos = self._get_skip_height(_pos)
+            _skip_prev_pos = self._get_skip_height(_pos - 1)
+            _skip_hash = _block.get_skip_hash()
+            if _skip_hash is not None and \
+                    (_skip_pos == position or
+                     (_skip_pos > position and
+                      not (_skip_prev_pos < _skip_pos - 2 and
+                           _skip_prev_pos >= position))):
+                block_hash = _skip_hash
+                _pos = _skip_pos
+            else:
+                block_hash = _block.predecessor_hash
+                _pos -= 1
+            _block = self._blockchain[block_hash]
+        return block_hash
+
+    def _find_common_ancestor(self, hash_a, hash_b):
+        """Returns the hash of the latest block both given blocks descend
+        from, using the skip pointers to find it in logarithmic time.
+        """
+        _pos = min(self._blockchain[hash_a].get_block_pos(),
+                   self._blockchain[hash_b].get_block_pos())
+        hash_a = self._get_ancestor(hash_a, _pos)
+        hash_b = self._get_ancestor(hash_b, _pos)
+        while hash_a != hash_b:
+            _block_a = self._blockchain[hash_a]
+            _block_b = self._blockchain[hash_b]
+            _skip_a = _block_a.get_skip_hash()
+            _skip_b = _block_b.get_skip_hash()
+            if _skip_a is not None and _skip_b is not None and _skip_a != _skip_b:
+                hash_a, hash_b = _skip_a, _skip_b
+            else:
+                hash_a = _block_a.predecessor_hash
+                hash_b = _block_b.predecessor_hash
+        return hash_a
+
+    def _set_node_branch_head(self, block_hash):
+        """Makes the given block the head of the branch this node is
+        following and updates the main chain array accordingly.
+        Returns the hash of the common ancestor of the old and new head.
+        """
+        if block_hash == self._node_branch_head:
+            # the followed branch did not change, e.g. when the other
+            # branches are pruned
+            return block_hash
+        _block = self._blockchain[block_hash]
+        if _block.predecessor_hash == self._node_branch_head:
+            _ancestor_hash = self._node_branch_head
+            self._main_chain.append(block_hash)
+            self._recent_transactions.extend(reversed(_block.transactions))
+        else:
+            _ancestor_hash = self._find_common_ancestor(self._node_branch_head,
+                                                        block_hash)
+            _ancestor_pos = self._blockchain[_ancestor_hash].get_block_pos()
+            _path = []
+            _b_hash = block_hash
+            while _b_hash != _ancestor_hash:
+                _path.append(_b_hash)
+                _b_hash = self._blockchain[_b_hash].predecessor_hash
+            _path.reverse()
+            self._main_chain = self._main_chain[:_ancestor_pos + 1] + _path
+            if _ancestor_hash == self._node_branch_head:
+                # the branch only grew, no transactions were rolled back
+                for _b_hash in _path:
+                    self._recent_transactions.extend(
+                        reversed(self._blockchain[_b_hash].transactions))
+            else:
+                self._recent_transactions = self._collect_recent_transactions()
+        self._node_branch_head = block_hash
+        self._publish_snapshot()
+        self._update_finalized_position()
+        return _ancestor_hash
+
+    def _collect_recent_transactions(self):
+        """Returns a new RingBuffer with the latest transactions of the
+        main chain, walking back only as far as needed to fill it"""
+        _recent = RingBuffer(self._recent_transactions.capacity)
+        _blocks = []
+        _count = 0
+        _position = len(self._main_chain) - 1
+        while _count < _recent.capacity and _position > 0:
+            _block = self._get_full_block(self._main_chain[_position])
+            _position -= 1
+            if _block is None:
+                continue
+            _blocks.append(_block)
+            _count += len(_block.transactions)
+        for _block in reversed(_blocks):
+            _recent.extend(reversed(_block.transactions))
+        return _recent
+
+    def _publish_snapshot(self):
+        """Publishes the followed branch for the readers"""
+        self._snapshot = ChainSnapshot(head_hash=self._node_branch_head,
+                                       height=len(self._main_chain) - 1,
+                                       main_chain=self._main_chain)
+
+    def _update_finalized_position(self):
+        """Moves the finality checkpoint along with the followed branch and
+        drops the transactions of the blocks which became final from
+        memory, if they are stored in the DB"""
+        _new_position = len(self._main_chain) - 1 - self._finality_depth
+        if _new_position <= self._finalized_position:
+            return
+        for _pos in range(self._finalized_position + 1, _new_position + 1):
+            self._drop_body(self._main_chain[_pos])
+        self._finalized_position = _new_position
+        self._logger.debug("Finality checkpoint moved to position {}"
+                           .format(_new_position))
+
+    def _drop_body(self, block_hash):
+        """Keeps only the headers of a final block in memory, if the block
+        is stored in the DB"""
+        if self._db is None or block_hash in self._unsaved_blocks:
+            return
+        _block = self._blockchain.get(block_hash)
+        if _block is not None and _block.has_body():
+            self._blockchain[block_hash] = _block.without_body()
+
+    def _get_full_block(self, block_hash):
+        """Returns the block with its transactions, reloading them from
+        the DB if the block only keeps its headers in memory.
+        Returns None if the block is not in the chain or its
+        transactions can not be loaded from the DB.
+        """
+        _block = self._blockchain.get(block_hash)
+        if _block is None or _block.has_body():
+            return _block
+        _stored_block = self._db.get_block_by_hash(block_hash)
+        if _stored_block is None:
+            self._logger.error("Block {} is missing in the DB".format(block_hash))
+            return None
+        _full_block = LogicalBlock.from_block(_stored_block, self._consensus)
+        _full_block.set_block_pos(_block.get_block_pos())
+        return _full_block
+
+    def _is_in_main_chain(self, block_hash, snapshot=None):
+        """Checks whether the block is part of the branch this node follows,
+        or of the branch published in the given snapshot"""
+        _block = self._blockchain.get(block_hash)
+        if _block is None:
+            return False
+        if snapshot is None:
+            snapshot = self._snapshot
+        _pos = _block.get_block_pos()
+        return _pos <= snapshot.height and snapshot.main_chain[_pos] == block_hash
+
+    def _get_difficulty_window(self, block):
+        """Returns the difficulty window ending at the given block.
+        Windows are computed incrementally from the predecessor's window
+        and cached on the blocks. Returns None for the genesis block.
+        """
+        if block.block_id == 0:
+            return None
+        # collect the blocks whose window is not computed yet
+        _pending = []
+        _block = block
+        while _block is not None and _block.block_id != 0 \
+                and _block.get_difficulty_window() is None:
+            _pending.append(_block)
+            _block = self._blockchain.get(_block.predecessor_hash)
+        _window = _block.get_difficulty_window() if _block is not None else None
+        _max_blocks = max(self._min_blocks, 1)
+        for _block in reversed(_pending):
+            _entry = (_block.timestamp, _block.difficulty)
+            if _window is None:
+                _entries = (_entry,)
+                _sum = _block.difficulty
+            else:
+                _entries = _window.entries + (_entry,)
+                _sum = _window.difficulty_sum + _block.difficulty
+                if len(_entries) > _max_blocks:
+                    _sum -= _entries[0][1]
+                    _entries = _entries[1:]
+            _window = DifficultyWindow(latest_timestamp=_block.timestamp,
+                                       earliest_timestamp=_entries[0][0],
+                                       num_of_blocks=len(_entries),
+                                       difficulty_sum=_sum,
+                                       entries=_entries)
+            _block.set_difficulty_window(_window)
+        return block.get_difficulty_window()
+
+    def _get_transaction_hash(self, transaction):
+        """Returns the hash of the transaction, computing it if not set"""
+        return transaction.get_hash(self._crypto_helper)
 
     def get_block_range(self, range_start=None, range_end=None):
         """Returns a list of Lblock objects from the blockchain range_start and range_end inclusive.
         Chain followed by this node is the one traversed.
         range_start or range_end are block hashes
         if range_end is not specified, all blocks till end of chain are returned
-        if chain couldn't be traversed at some point we have bigger bugs in code
         if range_start or range_end is not found in chain, returns None
         """
+        while True:
+            _snapshot = self._snapshot
+            blocks_range = self._get_block_range(range_start, range_end, _snapshot)
+            if blocks_range is not None or _snapshot is self._snapshot:
+                return blocks_range
+            # the followed branch was switched meanwhile, try again
+
+    def _get_block_range(self, range_start, range_end, _snapshot):
+        """Returns the block range along the branch of the given snapshot"""
         if not range_start:
             range_start = self._first_block_hash
         if not range_end:
-            range_end = self._node_branch_head
-        _b_hash = range_end
+            range_end = _snapshot.head_hash
 
-        if any([range_start not in self._blockchain,
-                range_end not in self._blockchain]):
+        _start_block = self._blockchain.get(range_start)
+        _end_block = self._blockchain.get(range_end)
+        if _start_block is None or _end_block is None:
             return None
 
-        blocks_range = []
-        while _b_hash != range_start:
-            _b = self._blockchain.get(_b_hash)
-            _b_hash = _b.predecessor_hash
-            blocks_range.append(_b)
-        if not _b_hash == self._first_block_hash:
-            blocks_range.append(self._blockchain.get(_b_hash))
+        _start_pos = _start_block.get_block_pos()
+        _end_pos = _end_block.get_block_pos()
+        if self._is_in_main_chain(range_start, _snapshot) and \
+                self._is_in_main_chain(range_end, _snapshot):
+            _hashes = _snapshot.main_chain[max(_start_pos, 1):_end_pos + 1]
+        else:
+            try:
+                if self._get_ancestor(range_end, _start_pos) != range_start:
+                    return None
+                _hashes = []
+                _b_hash = range_end
+                while _b_hash != range_start:
+                    _hashes.append(_b_hash)
+                    _b_hash = self._blockchain[_b_hash].predecessor_hash
+            except KeyError:
+                # the branch was pruned while traversing it
+                return None
+            if not _b_hash == self._first_block_hash:
+                _hashes.append(_b_hash)
+            _hashes.reverse()
+
+        blocks_range = [self._get_full_block(_hash) for _hash in reversed(_hashes)]
+        if any(_block is None for _block in blocks_range):
+            return None
         return blocks_range
 
     def get_block_by_id(self, block_id):
-        """Returns the block if found in blockchain, else returns None"""
-        block_list = []
-        for _, _block in self._blockchain.items():
-            if _block.block_id == block_id:
-                block_list.append(_block)
-        return block_list
+        """Returns the list of blocks with the given block id found in
+        the blockchain, empty list if there are none"""
+        _blocks = [self._get_full_block(_hash)
+                   for _hash in self._block_id_index.get(block_id, ())]
+        return [_block for _block in _blocks if _block is not None]
 
     def get_block_by_hash(self, block_hash):
         """Sends the Block information requested by any neighbour.
@@ -139,12 +581,43 @@ class BlockChain:
 
         """
 
-        block_info = None
-        _req_block = self._blockchain.get(block_hash, None)
-        if _req_block:
-            block_info = _req_block.get_json()
+        block_info = self._block_json_cache.get(block_hash)
+        if block_info is None:
+            _req_block = self._get_full_block(block_hash)
+            if _req_block:
+                block_info = _req_block.get_json()
+                self._block_json_cache.put(block_hash, block_info)
+                if block_hash not in self._blockchain:
+                    # pruned while the JSON was built, the removal may
+                    # have missed the entry put above
+                    self._block_json_cache.remove(block_hash)
         return block_info
 
+    def get_merkle_proof(self, transaction_hash):
+        """Returns the proof that a transaction is included in a block of
+        the chain, which can be checked with MerkleTree.verify_proof.
+
+        Parameters
+        ----------
+        transaction_hash : Hash
+            Hash of the transaction
+
+        Returns
+        -------
+        Dict
+            Hash of the block, its Merkle Tree root, the hash of the
+            transaction and the proof. None if the transaction is not
+            found in the chain.
+        """
+        for _hash, _pos in self._transaction_index.get(transaction_hash, ()):
+            _block = self._get_full_block(_hash)
+            if _block is not None:
+                return {'blockHash': _hash,
+                        'merkleHash': _block.merkle_tree_root,
+                        'transactionHash': transaction_hash,
+                        'proof': _block.get_merkle_tree().get_proof(_pos)}
+        return None
+
     def get_transaction(self, transaction_hash):
         """
         Parameters
@@ -157,38 +630,150 @@ class BlockChain:
             (Transaction obj, Block_hash)
         """
 
-        for _hash, _block in self._blockchain.items():
-            _txns = _block.transactions
-            for _txn in _txns:
-                if transaction_hash == _txn.transaction_hash:
-                    return _txn, _hash
+        for _hash, _pos in self._transaction_index.get(transaction_hash, ()):
+            _block = self._get_full_block(_hash)
+            if _block is not None:
+                return _block.transactions[_pos], _hash
         pool_transaction = self._txpool.get_transaction_by_hash(transaction_hash)[0]
-        if pool_transaction: 
+        if pool_transaction:
                 return pool_transaction,"No block hash - this transaction still in the pool"
         else:
             return None, None
 
+    def get_transactions_by_sender(self, address, offset=0, limit=None):
+        """Returns the transactions sent by the given address, in the
+        order they were added to the chain.
+
+        Parameters
+        ----------
+        address : String
+            Public key of the sender
+        offset : Int
+            Number of matching transactions to skip
+        limit : Int
+            Maximum number of transactions to return, all if None
+
+        Returns
+        -------
+        List of transactions
+        """
+        return self._get_indexed_transactions(self._sender_index, address,
+                                              offset, limit)
+
+    def get_transactions_by_receiver(self, address, offset=0, limit=None):
+        """Returns the transactions received by the given address, in the
+        order they were added to the chain.
+
+        Parameters
+        ----------
+        address : String
+            Public key of the receiver
+        offset : Int
+            Number of matching transactions to skip
+        limit : Int
+            Maximum number of transactions to return, all if None
+
+        Returns
+        -------
+        List of transactions
+        """
+        return self._get_indexed_transactions(self._receiver_index, address,
+                                              offset, limit)
+
+    def _get_indexed_transactions(self, index, address, offset, limit):
+        """Resolves a page of references of an address index to transactions"""
+        _refs = index.get(address, [])
+        offset = int(offset)
+        _end = len(_refs) if limit is None else offset + int(limit)
+        _transactions = []
+        for _hash, _pos in _refs[offset:_end]:
+            _block = self._get_full_block(_hash)
+            if _block is not None:
+                _transactions.append(_block.transactions[_pos])
+        return _transactions
+
     def get_n_last_transactions(self,n):
         """
         Parameters
         ----------
         n: numbers of last mined transactions
+            Served from the recent transactions buffer if it holds enough,
+            otherwise the main chain is walked back
         Returns
         -------
         array of transactions
         """
         n = int(n)
+        _recent_transactions = self._recent_transactions
+        if n <= _recent_transactions.capacity:
+            return _recent_transactions.latest(n)
         number_of_transactions = 0
         total_transactions = []
-        current_block_hash = self._node_branch_head
-        while(number_of_transactions < n and self._blockchain[current_block_hash].block_id != 0):
+        _snapshot = self._snapshot
+        position = _snapshot.height
+        while number_of_transactions < n and position > 0:
             remained_transactions = n - number_of_transactions
-            block_transactions = self._blockchain[current_block_hash].transactions[:remained_transactions]
-            current_block_hash = self._blockchain[current_block_hash].predecessor_hash
+            _block = self._get_full_block(_snapshot.main_chain[position])
+            position -= 1
+            if _block is None:
+                continue
+            block_transactions = _block.transactions[:remained_transactions]
             total_transactions.extend(block_transactions)
             number_of_transactions += len(block_transactions)
         return total_transactions
     
+    def iter_transactions(self, cursor=None):
+        """Yields the transactions of the followed branch, oldest first,
+        without building a list of them.
+
+        Parameters
+        ----------
+        cursor : List
+            [height, offset] of the first transaction to yield, offset
+            being its index in the block. Starts at the genesis block if None
+
+        Returns
+        -------
+        Generator of ([height, offset], Transaction obj) pairs
+        """
+        _height, _offset = cursor if cursor else (0, 0)
+        _height, _offset = max(int(_height), 0), max(int(_offset), 0)
+        while True:
+            # take the latest snapshot for each block, so the stream follows
+            # the branch while it grows. Heights are stable unless reorganized
+            _snapshot = self._snapshot
+            if _height > _snapshot.height:
+                return
+            _block = self._get_full_block(_snapshot.main_chain[_height])
+            if _block is not None:
+                for _index in range(_offset, len(_block.transactions)):
+                    yield [_height, _index], _block.transactions[_index]
+            _height, _offset = _height + 1, 0
+
+    def get_transactions_page(self, cursor=None, limit=100):
+        """Returns a page of the transactions of the followed branch.
+
+        Parameters
+        ----------
+        cursor : List
+            [height, offset] as returned for the previous page, None for
+            the first page
+        limit : Int
+            Maximum number of transactions in the page
+
+        Returns
+        -------
+        Tuple
+            (List of Transaction obj, cursor of the next page or None if
+            there are no more transactions)
+        """
+        _transactions = []
+        for _position, _txn in self.iter_transactions(cursor):
+            if len(_transactions) >= limit:
+                return _transactions, _position
+            _transactions.append(_txn)
+        return _transactions, None
+
     def get_all_transactions(self):
         """
         Parameters
@@ -200,9 +785,11 @@ class BlockChain:
             (Transaction obj, Block_hash)
         """
         res = []
-        for _hash, _block in self._blockchain.items():
-            _txns = _block.transactions
-            for _txn in _txns:
+        for _hash in list(self._blockchain):
+            _block = self._get_full_block(_hash)
+            if _block is None:
+                continue
+            for _txn in _block.transactions:
                 #if transaction_hash == _txn.transaction_hash:
                 res.append(_txn)
                 #return _txn
@@ -236,44 +823,20 @@ class BlockChain:
             difficulty of the latest block
         """
         if not _hash:
-            _hash = self._node_branch_head
-        last_block_json = self.get_block_by_hash(_hash)
-        if last_block_json:
-            _last_block = json.loads(last_block_json)
-        else:
+            _hash = self._snapshot.head_hash
+        _last_block = self._blockchain.get(_hash)
+        if _last_block is None:
             return -1, -1, -1, -1
 
         # if only genesis block present in chain return 0 as timestamps
         # and 1 as difficulty
-        if _last_block["nr"] == 0:
+        if _last_block.block_id == 0:
             return 0, 0, 1, 1
 
-        avg_difficulty = 0
-        # getting timestamp and difficulty of the last block added in the chain
-        _latest_timestamp = _last_block['timestamp']
-        _latest_difficulty = _last_block['difficulty']
-        avg_difficulty += _latest_difficulty
-
-        # setting hash of the second last block
-        _hash = _last_block['predecessorBlock']
-        # if there is only one block
-        _earliest_timestamp = _latest_timestamp
-        _number_of_blocks = 1
-        # looping over last min_blocks to get the timestamp of the earliest block
-        while _number_of_blocks < self._min_blocks:
-            _json_block = self.get_block_by_hash(_hash)
-            if _json_block is None:
-                break
-            _block = json.loads(_json_block)
-            _id = _block["nr"]
-            if _id == 0:
-                break
-            _earliest_timestamp = _block['timestamp']
-            _hash = _block['predecessorBlock']
-            avg_difficulty += _block['difficulty']
-            _number_of_blocks += 1
-        avg_difficulty = float(avg_difficulty) / _number_of_blocks
-        return _latest_timestamp, _earliest_timestamp, _number_of_blocks, avg_difficulty
+        _window = self._get_difficulty_window(_last_block)
+        avg_difficulty = float(_window.difficulty_sum) / _window.num_of_blocks
+        return _window.latest_timestamp, _window.earliest_timestamp, \
+            _window.num_of_blocks, avg_difficulty
 
     def add_block(self, block, db_flag=True):
         """Finds correct position and adds the new block to the chain.
@@ -297,9 +860,52 @@ class BlockChain:
             self._logger.debug("Converting block to logical block ")
             block = LogicalBlock.from_block(block, self._consensus)
 
-        if block.get_computed_hash() in self._blockchain:
+        with self._write_lock:
+            return self._add_block(block, db_flag)
+
+    def _add_block(self, block, db_flag):
+        """Adds the block, the caller holds the write lock"""
+        _curr_block_hash = block.get_computed_hash()
+        if _curr_block_hash in self._blockchain or \
+                _curr_block_hash in self._orphan_blocks:
+            return False
+
+        status = self._insert_block(block, db_flag)
+        if status == self._BLOCK_INVALID:
             return False
+        if status == self._BLOCK_ADDED:
+            self._adopt_orphans(_curr_block_hash, db_flag)
+
+        # kill mine check
+        if not block.is_block_ours(self._node_id):
+            self.check_block_in_mining(block)
 
+        self._logger.info("Added new block --- \n {h} \n {b} \n".
+                    format(h=str(_curr_block_hash), b=str(block)))
+
+        self._logger.debug("Number of branches currently branch heads = {}"
+                           .format(len(self._current_branch_heads)))
+        i = 0
+        for branch in self._current_branch_heads:
+            self._logger.debug("Branch {} : {}".format(i + 1, branch))
+            i += 1
+        self._switch_to_longest_branch()
+        return True
+
+    def _insert_block(self, block, db_flag, save_deferred=False,
+                      signatures_verified=False):
+        """Validates the block and inserts it into the chain, or stores it
+        in the orphan pool if its predecessor is missing.
+        Fork choice is left to the caller, as well as saving the block if
+        save_deferred is set.
+
+        Returns
+        -------
+        Int
+            _BLOCK_ADDED if the block was added to the chain
+            _BLOCK_ORPHANED if the block was stored as orphan
+            _BLOCK_INVALID if the block was discarded
+        """
         _prev_hash = block.predecessor_hash
         _curr_block_hash = block.get_computed_hash()
         _curr_block = block
@@ -308,74 +914,160 @@ class BlockChain:
             self.calculate_diff(block.predecessor_hash)
 
         validity_level = block.validate_block(_latest_ts, _earliest_ts,
-                                              _num_of_blocks, _latest_difficulty)
+                                              _num_of_blocks, _latest_difficulty,
+                                              self._verification_engine,
+                                              signatures_verified)
 
         if _prev_hash not in self._blockchain:
-            if validity_level == -3:
-                self._logger.debug("Block has been put to orphan pool, "
-                                   "since predecessor was not found")
-                self._orphan_blocks[_prev_hash] = _curr_block
-                self.request_block_from_neighbour(_prev_hash)
-        else:
-            if not validity_level == 0:
-                self._logger.debug("The block received is not valid, "
+            if validity_level != -3:
+                self._logger.debug("The orphan block received is not valid, "
                                    "discarding this block -- \n {b}".
                                    format(b=str(block)))
-                if block.is_block_ours(self._node_id):
-                    self._logger.debug("Since this block is ours, returning the "
-                                 "transactions back to transaction pool")
-                    _txns = block.transactions
-                    self._txpool.return_transactions_to_pool(_txns)
-                del block
-                return False
-
-            _prev_block = self._blockchain.get(_prev_hash)
-            _prev_block_pos = _prev_block.get_block_pos()
-
-            if _prev_hash in self._current_branch_heads:
-                self._current_branch_heads.remove(_prev_hash)
-            else:
-                if _prev_block_pos < self._furthest_branching_point["position"]:
-                    self._furthest_branching_point["position"] = _prev_block_pos
-                    self._furthest_branching_point["block"] = _prev_block
-
-            _curr_block.set_block_pos(_prev_block_pos + 1)
-            self._blockchain[_curr_block_hash] = _curr_block
-            self._current_branch_heads.append(_curr_block_hash)
-            if db_flag:
-                self._db.save_block(block)
+                return self._BLOCK_INVALID
+            self._logger.debug("Block has been put to orphan pool, "
+                               "since predecessor was not found")
+            if self._orphan_blocks.add(_curr_block_hash, _curr_block):
+                self.request_block_from_neighbour(_prev_hash)
+            return self._BLOCK_ORPHANED
+
+        if not validity_level == 0:
+            self._logger.debug("The block received is not valid, "
+                               "discarding this block -- \n {b}".
+                               format(b=str(block)))
+            if block.is_block_ours(self._node_id):
+                self._logger.debug("Since this block is ours, returning the "
+                             "transactions back to transaction pool")
+                _txns = block.transactions
+                self._txpool.return_transactions_to_pool(_txns)
+            return self._BLOCK_INVALID
+
+        _prev_block = self._blockchain.get(_prev_hash)
+        _prev_block_pos = _prev_block.get_block_pos()
+        if _prev_block_pos < self._finalized_position:
+            self._logger.debug("The block received forks off before the "
+                               "finality checkpoint, discarding this block -- "
+                               "\n {b}".format(b=str(block)))
+            return self._BLOCK_INVALID
+
+        if _prev_hash in self._current_branch_heads:
+            self._remove_branch_head(_prev_hash)
+        else:
+            if _prev_block_pos < self._furthest_branching_point["position"]:
+                self._furthest_branching_point["position"] = _prev_block_pos
+                self._furthest_branching_point["block"] = _prev_block
+
+        _curr_block.set_block_pos(_prev_block_pos + 1)
+        self._add_to_chain(_curr_block_hash, _curr_block)
+        self._add_branch_head(_curr_block_hash, _curr_block)
+        if db_flag:
+            if save_deferred:
+                # keep the transactions in memory until the caller saved it
+                self._unsaved_blocks.add(_curr_block_hash)
+            elif self._db.save_block(block):
                 self._logger.info('Saved block no. {} to DB'.format(block.block_id))
+            else:
+                self._unsaved_blocks.add(_curr_block_hash)
 
-            if _prev_hash == self._node_branch_head:
-                self._logger.debug("Branch head updated for node {}".format(self._node_id))
-                self._node_branch_head = _curr_block_hash
-
-            # Check recursively if blocks are parent to some orphans
-            _parent_hash = _curr_block_hash
-            _parent_block = _curr_block
-            while _parent_hash in self._orphan_blocks:
-                _block = self._orphan_blocks[_parent_hash]
-                _this_block_hash = _block.get_computed_hash()
-                _block.set_block_pos(_parent_block.get_block_pos() + 1)
-                self._blockchain[_this_block_hash] = _block
-                _parent_hash = _this_block_hash
-                _parent_block = _block
+        if _prev_hash == self._node_branch_head:
+            self._logger.debug("Branch head updated for node {}".format(self._node_id))
+            self._set_node_branch_head(_curr_block_hash)
+        return self._BLOCK_ADDED
 
-        # kill mine check
-        if not block.is_block_ours(self._node_id):
-            self.check_block_in_mining(block)
+    def _adopt_orphans(self, parent_hash, db_flag, save_deferred=False):
+        """Inserts the orphans descending from the given block into the
+        chain, validating and saving each of them like a new block.
+        Returns the adopted blocks.
+        """
+        _adopted = []
+        _parents = [parent_hash]
+        while _parents:
+            _parent_hash = _parents.pop()
+            for _block in self._orphan_blocks.pop_children(_parent_hash):
+                self._logger.debug("Adopting orphan block {}".format(_block.block_id))
+                if self._insert_block(_block, db_flag,
+                                      save_deferred) == self._BLOCK_ADDED:
+                    _adopted.append(_block)
+                    _parents.append(_block.get_computed_hash())
+        return _adopted
+
+    def add_blocks(self, blocks, db_flag=True):
+        """Adds a run of blocks, e.g. received while bootstrapping.
+        Each block is validated and inserted like in add_block, but the
+        signatures of all blocks are verified together, the blocks are
+        saved to the DB in a single transaction and the fork choice runs
+        only once at the end.
 
-        self._logger.info("Added new block --- \n {h} \n {b} \n".
-                    format(h=str(block.get_computed_hash()), b=str(block)))
+        Parameters
+        ----------
+        blocks : Iterable of Block instances
+            The blocks to be added, predecessors first
+        db_flag : Boolean
+            To check if provided blocks be added to DB or not
 
-        self._logger.debug("Number of branches currently branch heads = {}"
-                           .format(len(self._current_branch_heads)))
-        i = 0
-        for branch in self._current_branch_heads:
-            self._logger.debug("Branch {} : {}".format(i + 1, branch))
-            i += 1
-        self.switch_to_longest_branch()
-        return True
+        Returns
+        -------
+        Int
+            Number of blocks added to the chain
+        """
+        _added = []
+        with self._write_lock:
+            _blocks = []
+            for block in blocks:
+                if not isinstance(block, LogicalBlock):
+                    block = LogicalBlock.from_block(block, self._consensus)
+                _curr_block_hash = block.get_computed_hash()
+                if _curr_block_hash not in self._blockchain and \
+                        _curr_block_hash not in self._orphan_blocks:
+                    _blocks.append(block)
+            # None if the signatures are left to the validation of each block
+            _signatures_valid = [None] * len(_blocks)
+            if self._verification_engine is not None:
+                _signatures_valid = self._verification_engine.verify_blocks(_blocks)
+
+            for block, _verified in zip(_blocks, _signatures_valid):
+                _curr_block_hash = block.get_computed_hash()
+                if _curr_block_hash in self._blockchain or \
+                        _curr_block_hash in self._orphan_blocks:
+                    continue
+                if _verified is False:
+                    self._logger.debug("The block received has invalid "
+                                       "signatures, discarding this block -- "
+                                       "\n {b}".format(b=str(block)))
+                    continue
+                if self._insert_block(block, db_flag, True,
+                                      bool(_verified)) != self._BLOCK_ADDED:
+                    continue
+                _added.append(block)
+                _added.extend(self._adopt_orphans(_curr_block_hash, db_flag, True))
+                if not block.is_block_ours(self._node_id):
+                    self.check_block_in_mining(block)
+
+            if db_flag and _added:
+                self._save_blocks(_added)
+            self._logger.info("Added {} blocks".format(len(_added)))
+            self._switch_to_longest_branch()
+        return len(_added)
+
+    def _save_blocks(self, blocks):
+        """Saves the blocks added by add_blocks to the DB and drops the
+        transactions of those which are already final.
+        If the blocks can not be saved at once, e.g. because one of them
+        conflicts with a stored row, they are saved one by one and only
+        the failed ones are kept as unsaved.
+        """
+        if self._db.save_blocks(blocks):
+            _saved_blocks = blocks
+        else:
+            _saved_blocks = [_block for _block in blocks
+                             if self._db.save_block(_block)]
+        self._logger.info('Saved {} of {} blocks to DB'
+                          .format(len(_saved_blocks), len(blocks)))
+        for _block in _saved_blocks:
+            _block_hash = _block.get_computed_hash()
+            self._unsaved_blocks.discard(_block_hash)
+            if _block.get_block_pos() <= self._finalized_position and \
+                    self._is_in_main_chain(_block_hash):
+                self._drop_body(_block_hash)
 
     def create_block(self, transactions):
         """Creates a new LogicalBlock instance.
@@ -392,11 +1084,12 @@ class BlockChain:
 
         """
 
-        _curr_head = self._blockchain[self._node_branch_head]
+        _head_hash = self._snapshot.head_hash
+        _curr_head = self._blockchain[_head_hash]
         _new_block_id = _curr_head.block_id + 1
         new_block = LogicalBlock(block_id=_new_block_id,
                                  transactions=transactions,
-                                 predecessor_hash=self._node_branch_head,
+                                 predecessor_hash=_head_hash,
                                  block_creator_id=self._node_id,
                                  consensus_obj=self._consensus)
         return new_block
@@ -408,6 +1101,11 @@ class BlockChain:
         the tolerance level defined.
 
         """
+        with self._write_lock:
+            self._switch_to_longest_branch()
+
+    def _switch_to_longest_branch(self):
+        """Switches branches, the caller holds the write lock"""
         if len(self._current_branch_heads) == 1:
             # No Branching happened yet, nothing to do here
             return
@@ -416,42 +1114,49 @@ class BlockChain:
         _check_point = self._furthest_branching_point['block']
         _check_point_hash = _check_point.get_computed_hash()
 
-        _max_len = 0
-        _max_head = None
-        for _branch_head_hash in self._current_branch_heads:
-            _head = self._blockchain.get(_branch_head_hash)
-            _path_len = _head.get_block_pos() - _check_point_pos
-            if _path_len > _max_len:
-                _max_len = _path_len
-                _max_head = _head
+        _new_head_hash = self._get_best_branch_head()
+        _max_head = self._blockchain.get(_new_head_hash)
+        _max_len = _max_head.get_block_pos() - _check_point_pos
 
         if _max_len > self._tolerance_level:
             self._logger.debug("Crossed Tolerance level, branch switching took place")
-            _new_head_hash = _max_head.get_computed_hash()
 
             # Save all block hashes between furthest branch and head in max chain
             _b_hash = _new_head_hash
-            _longest_chain = []
+            _longest_chain = set()
             while _b_hash != _check_point_hash:
-                _longest_chain.append(_b_hash)
+                _longest_chain.add(_b_hash)
                 _b = self._blockchain.get(_b_hash)
                 _b_hash = _b.predecessor_hash
-            _longest_chain.append(_check_point_hash)
+            _longest_chain.add(_check_point_hash)
 
-            # Remove all other branches
-            # self._current_branch_heads.remove(_new_head_hash)
+            # Collect the blocks of all other branches before changing
+            # anything, branches may share blocks below their heads
+            _pruned_hashes = []
+            _seen = set(_longest_chain)
             for _head in self._current_branch_heads:
                 _b_hash = _head
-                while _b_hash not in _longest_chain:
-                    _b = self._blockchain.pop(_b_hash)
-                    if _b.is_block_ours(self._node_id):
-                        _txns = _b.transactions
-                        self._txpool.return_transactions_to_pool(_txns)
-                    _b_hash = _b.predecessor_hash
-                    del _b
-
-            self._current_branch_heads = [_new_head_hash, ]
-            self._node_branch_head = _new_head_hash
+                while _b_hash not in _seen:
+                    _seen.add(_b_hash)
+                    _pruned_hashes.append(_b_hash)
+                    _b_hash = self._blockchain[_b_hash].predecessor_hash
+
+            _old_head_pos = self._blockchain[self._node_branch_head].get_block_pos()
+            _ancestor_hash = self._set_node_branch_head(_new_head_hash)
+            self._logger.debug("Reorganization depth: {}".format(
+                _old_head_pos - self._blockchain[_ancestor_hash].get_block_pos()))
+
+            # Remove all other branches
+            for _b_hash in _pruned_hashes:
+                _b = self._remove_from_chain(_b_hash)
+                if _b.is_block_ours(self._node_id):
+                    _txns = _b.transactions
+                    self._txpool.return_transactions_to_pool(_txns)
+                del _b
+
+            self._current_branch_heads = set()
+            self._branch_heads_heap = []
+            self._add_branch_head(_new_head_hash, _max_head)
             self._furthest_branching_point = {"block": None, "position": float("inf")}
             self._logger.debug("Branch switching successful, new node branch head : {}".
                          format(self._node_branch_head))
@@ -460,14 +1165,112 @@ class BlockChain:
         """Delete orphans stored in the orphan store once the pruning
         interval as defined in config has crossed
         """
-        _curr_time = datetime.now()
-        for _hash in self._orphan_blocks:
-            _block = self._orphan_blocks[_hash]
-            _block_creation_time = datetime.fromtimestamp(_block.timestamp)
-            _time_passed = (_curr_time - _block_creation_time).total_seconds()
-            if _time_passed >= self._pruning_interval:
-                self._orphan_blocks.pop(_hash)
-                del _block
+        with self._write_lock:
+            _pruned = self._orphan_blocks.prune()
+        if _pruned:
+            self._logger.debug("Pruned {} orphan blocks".format(_pruned))
+
+    def get_finalized_position(self):
+        """Returns the position of the finality checkpoint. No block can
+        fork off the chain below it.
+
+        Returns
+        -------
+        Int
+            The position of the last final block
+        """
+        return self._finalized_position
+
+    def dump_state(self):
+        """Serializes the blocks, positions, branch heads and indexes of the
+        chain, so it can be restored with load_state without validating
+        the blocks again. Orphan blocks are not included.
+
+        Only shallow copies of the containers are taken under the write
+        lock, the pickling itself does not block the writers. Blocks in
+        the chain are replaced rather than modified, and the entries of
+        the block id and transaction indexes are immutable.
+
+        Returns
+        -------
+        Bytes
+            The pickled state
+        """
+        with self._write_lock:
+            _state = {'version': self._STATE_VERSION,
+                      'genesis': self._first_block_hash,
+                      'blockchain': dict(self._blockchain),
+                      'block_id_index': dict(self._block_id_index),
+                      'transaction_index': dict(self._transaction_index),
+                      # the address entries are appended to in place
+                      'sender_index': {_address: list(_refs) for _address, _refs
+                                       in self._sender_index.items()},
+                      'receiver_index': {_address: list(_refs) for _address, _refs
+                                         in self._receiver_index.items()},
+                      'current_branch_heads': set(self._current_branch_heads),
+                      'branch_heads_heap': list(self._branch_heads_heap),
+                      'node_branch_head': self._node_branch_head,
+                      'main_chain': list(self._main_chain),
+                      'furthest_branching_point': self._furthest_branching_point,
+                      'finalized_position': self._finalized_position,
+                      'unsaved_blocks': set(self._unsaved_blocks)}
+        return pickle.dumps(_state, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def load_state(self, data):
+        """Replaces the chain with a state serialized by dump_state.
+        Only the chain classes are unpickled, any other object in the
+        state makes the load fail. The state is discarded if its head
+        is not stored in the DB, e.g. because the DB was replaced.
+
+        Parameters
+        ----------
+        data : Bytes
+            The pickled state
+
+        Returns
+        -------
+        Boolean
+            True if the state was loaded
+        """
+        try:
+            _state = _StateUnpickler(io.BytesIO(data)).load()
+        except Exception as e:
+            self._logger.warning("Could not load chain state: {}".format(e))
+            return False
+        if not isinstance(_state, dict) or \
+                _state.get('version') != self._STATE_VERSION or \
+                _state.get('genesis') != self._first_block_hash:
+            self._logger.warning("Ignoring chain state of another format "
+                                 "or chain")
+            return False
+        _head_hash = _state['node_branch_head']
+        if self._db is not None and _head_hash != self._first_block_hash and \
+                self._db.get_block_by_hash(_head_hash) is None:
+            self._logger.warning("Ignoring chain state, its head {} is not "
+                                 "in the DB".format(_head_hash))
+            return False
+        with self._write_lock:
+            for _block in _state['blockchain'].values():
+                _block.set_consensus(self._consensus)
+            self._blockchain = _state['blockchain']
+            self._block_id_index = _state['block_id_index']
+            self._transaction_index = _state['transaction_index']
+            self._sender_index = _state['sender_index']
+            self._receiver_index = _state['receiver_index']
+            self._current_branch_heads = _state['current_branch_heads']
+            self._branch_heads_heap = _state['branch_heads_heap']
+            self._node_branch_head = _state['node_branch_head']
+            self._main_chain = _state['main_chain']
+            self._furthest_branching_point = _state['furthest_branching_point']
+            self._finalized_position = _state['finalized_position']
+            self._unsaved_blocks = _state['unsaved_blocks']
+            self._block_json_cache.clear()
+            self._publish_snapshot()
+            self._recent_transactions = self._collect_recent_transactions()
+        self._logger.info("Loaded chain state with {} blocks, head at "
+                          "position {}".format(len(self._blockchain),
+                                               len(self._main_chain) - 1))
+        return True
 
     def request_block_from_neighbour(self, requested_block_hash):
         """Requests a block from other nodes connected with.
@@ -494,18 +1297,6 @@ class BlockChain:
             if block.mine_equality(self._active_mine_block):
                 self._logger.info("Kill mine equality true")
                 self._consensus.kill_mine = 1
-                try:
-                    unmined_transactions = list(
-                        set(self._active_mine_block.transactions).difference(set(block.transactions)))
-                except (TypeError, NoHashError):
-                    for t in self._active_mine_block.transactions:
-                        if not t.transaction_hash:
-                            thash = self._crypto_helper.hash(t.get_json())
-                            t.transaction_hash = thash
-                    for t in block.transactions:
-                        if not t.transaction_hash:
-                            thash = self._crypto_helper.hash(t.get_json())
-                            t.transaction_hash = thash
-                    unmined_transactions = list(
-                        set(self._active_mine_block.transactions).difference(set(block.transactions)))
+                unmined_transactions = list(
+                    set(self._active_mine_block.transactions).difference(set(block.transactions)))
                 self._txpool.return_transactions_to_pool(unmined_transactions)
@@ -0,0 +1,150 @@
+from hashlib import sha256 as sha
+
+
+def hash_pair(left, right):
+    """Returns the hash of the inner node with the given children"""
+    return sha(str(left + right).encode('UTF-8')).hexdigest()
+
+
+class MerkleTree:
+    """Merkle tree over the transaction hashes of a block.
+
+    Neighbouring hashes are combined pairwise level by level, the last
+    hash of a level with an odd number of hashes is promoted to the next
+    level unchanged. All levels are kept, so inclusion proofs can be
+    created without rehashing.
+    """
+
+    def __init__(self, leaves):
+        """Constructor for MerkleTree
+
+        Parameters
+        ----------
+        leaves : List
+            Hashes of the transactions, in block order
+
+        Attributes
+        ----------
+        _levels : List
+            Hashes of each level of the tree, leaves first and root last
+        """
+        level = list(leaves)
+        self._levels = [level]
+        while len(level) > 1:
+            level = [hash_pair(level[i], level[i + 1]) if i + 1 < len(level)
+                     else level[i]
+                     for i in range(0, len(level), 2)]
+            self._levels.append(level)
+
+    def __len__(self):
+        return len(self._levels[0])
+
+    def get_root(self):
+        """Returns the root hash, None if the tree has no leaves"""
+        if not self._levels[0]:
+            return None
+        return self._levels[-1][0]
+
+    def get_proof(self, index):
+        """Returns the inclusion proof of the leaf at the given index.
+
+        Returns
+        -------
+        List
+            Dicts with the sibling 'hash' of each step from the leaf up to
+            the root and its 'position', either 'left' or 'right'.
+            Steps where the node is promoted unchanged are left out.
+        """
+        if not 0 <= index < len(self):
+            raise IndexError('Leaf index out of range')
+        proof = []
+        for level in self._levels[:-1]:
+            if index % 2:
+                proof.append({'hash': level[index - 1], 'position': 'left'})
+            elif index + 1 < len(level):
+                proof.append({'hash': level[index + 1], 'position': 'right'})
+            index //= 2
+        return proof
+
+    @staticmethod
+    def verify_proof(leaf, proof, root):
+        """Checks the inclusion proof of a leaf against the root hash.
+
+        Parameters
+        ----------
+        leaf : Hash
+            Hash of the transaction
+        proof : List
+            Proof as returned by get_proof
+        root : Hash
+            Merkle tree root of the block
+
+        Returns
+        -------
+        Boolean
+            True if the proof shows that the leaf is part of the tree
+        """
+        node = leaf
+        try:
+            for step in proof:
+                if step['position'] == 'left':
+                    node = hash_pair(step['hash'], node)
+                elif step['position'] == 'right':
+                    node = hash_pair(node, step['hash'])
+                else:
+                    return False
+        except (KeyError, TypeError):
+            return False
+        return node == root
+
+
+class MerkleAccumulator:
+    """Append only Merkle tree which keeps the roots of its perfect
+    subtrees only, like a binary counter. Appending a hash and computing
+    the root take logarithmic work. The roots are the same as the ones
+    of a MerkleTree over the same hashes.
+    """
+
+    def __init__(self, leaves=()):
+        """Constructor for MerkleAccumulator
+
+        Parameters
+        ----------
+        leaves : List
+            Hashes to start with
+
+        Attributes
+        ----------
+        _peaks : List
+            (height, hash) of the perfect subtrees, from left to right with
+            strictly decreasing heights
+        _size : Int
+            Number of hashes appended
+        """
+        self._peaks = []
+        self._size = 0
+        for leaf in leaves:
+            self.append(leaf)
+
+    def __len__(self):
+        return self._size
+
+    def append(self, leaf):
+        """Appends the hash of a transaction"""
+        height, node = 0, leaf
+        while self._peaks and self._peaks[-1][0] == height:
+            _, left = self._peaks.pop()
+            height, node = height + 1, hash_pair(left, node)
+        self._peaks.append((height, node))
+        self._size += 1
+
+    def get_root(self):
+        """Returns the root hash, None if no hashes were appended"""
+        if not self._peaks:
+            return None
+        # promoted nodes of the tree are combined with their left
+        # neighbours only at the level they meet, i.e. from the right
+        root = self._peaks[-1][1]
+        for _, peak in reversed(self._peaks[:-1]):
+            root = hash_pair(peak, root)
+        return root
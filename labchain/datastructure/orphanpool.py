@@ -0,0 +1,109 @@
+import heapq
+import logging
+import time
+
+
+class OrphanPool:
+    """Stores blocks whose predecessor block is not in the chain yet.
+
+    Several orphans may share the same predecessor. The pool is bounded,
+    when it is full the orphan which arrived first is evicted.
+    """
+
+    def __init__(self, max_size, pruning_interval):
+        """Constructor for OrphanPool
+
+        Parameters
+        ----------
+        max_size : Int
+            Maximum number of orphan blocks kept in the pool, at least one
+            orphan is kept so its predecessor can be requested
+        pruning_interval : Int
+            Number of seconds an orphan block is kept before being pruned
+
+        Attributes
+        ----------
+        _orphans : Dictionary
+            key = block hash, value = (LogicalBlock instance, arrival time)
+        _children : Dictionary
+            key = predecessor block hash, value = set of orphan block hashes
+        _arrivals : List
+            Heap of (arrival time, block hash) of the orphans, entries of
+            orphans which already left the pool are skipped lazily
+
+        """
+        self._logger = logging.getLogger(__name__)
+        self._max_size = max(max_size, 1)
+        self._pruning_interval = pruning_interval
+        self._orphans = {}
+        self._children = {}
+        self._arrivals = []
+
+    def __len__(self):
+        return len(self._orphans)
+
+    def __contains__(self, block_hash):
+        return block_hash in self._orphans
+
+    def add(self, block_hash, block, arrival_time=None):
+        """Adds a block to the pool, evicting the oldest orphan if full.
+
+        Returns
+        -------
+        Boolean
+            False if the block was already in the pool, True otherwise
+        """
+        if block_hash in self._orphans:
+            return False
+        if arrival_time is None:
+            arrival_time = time.time()
+        while len(self._orphans) >= self._max_size:
+            _, _evicted_hash = heapq.heappop(self._arrivals)
+            if _evicted_hash in self._orphans:
+                self._logger.debug("Orphan pool full, evicting block {}"
+                                   .format(_evicted_hash))
+                self.remove(_evicted_hash)
+        self._orphans[block_hash] = (block, arrival_time)
+        self._children.setdefault(block.predecessor_hash, set()).add(block_hash)
+        heapq.heappush(self._arrivals, (arrival_time, block_hash))
+        if len(self._arrivals) > 2 * len(self._orphans) + 16:
+            # drop the entries of orphans which already left the pool
+            self._arrivals = [_entry for _entry in self._arrivals
+                              if _entry[1] in self._orphans]
+            heapq.heapify(self._arrivals)
+        return True
+
+    def remove(self, block_hash):
+        """Removes a block from the pool and returns it, None if absent"""
+        _entry = self._orphans.pop(block_hash, None)
+        if _entry is None:
+            return None
+        _block = _entry[0]
+        _siblings = self._children.get(_block.predecessor_hash)
+        if _siblings is not None:
+            _siblings.discard(block_hash)
+            if not _siblings:
+                del self._children[_block.predecessor_hash]
+        return _block
+
+    def pop_children(self, predecessor_hash):
+        """Removes and returns all orphans whose predecessor is the given
+        block, in order of arrival"""
+        _hashes = self._children.pop(predecessor_hash, set())
+        _entries = sorted((self._orphans.pop(_hash) for _hash in _hashes),
+                          key=lambda _entry: _entry[1])
+        return [_block for _block, _ in _entries]
+
+    def prune(self, current_time=None):
+        """Removes the orphans which are stored longer than the pruning
+        interval. Returns the number of pruned orphans.
+        """
+        if current_time is None:
+            current_time = time.time()
+        _pruned = 0
+        while self._arrivals and \
+                current_time - self._arrivals[0][0] >= self._pruning_interval:
+            _, _hash = heapq.heappop(self._arrivals)
+            if self.remove(_hash) is not None:
+                _pruned += 1
+        return _pruned
@@ -1,9 +1,17 @@
 import json
 
+from labchain.util.utility import Utility
+from labchain.util.verificationCache import VerificationCache
+
 
 class Transaction:
     """Represents a single transaction within the blockchain.
+    The data can not be changed once the transaction is signed, so its JSON,
+    signing message and hash are computed once and cached.
+    The hash is stored as bytes.
     """
+    __slots__ = ('__sender', '__receiver', '__payload', '__signature',
+                 '__transaction_hash', '__json', '__signing_message')
 
     def __init__(self, sender, receiver, payload, signature=None):
         self.__sender = sender
@@ -11,6 +19,8 @@ class Transaction:
         self.__payload = payload
         self.__signature = signature
         self.__transaction_hash = None
+        self.__json = None
+        self.__signing_message = None
 
     def to_dict(self):
         """Convert own data to a dictionary."""
@@ -23,7 +33,9 @@ class Transaction:
 
     def get_json(self):
         """Serialize this instance to a JSON string."""
-        return json.dumps(self.to_dict())
+        if self.__json is None:
+            self.__json = json.dumps(self.to_dict())
+        return self.__json
 
     @staticmethod
     def from_json(json_data):
@@ -44,12 +56,7 @@ class Transaction:
         :param payload: JSON of the data to be signed.
         :param signature: Receeives signed transaction.
         """
-        data = json.dumps({
-            'sender': self.__sender,
-            'receiver': self.__receiver,
-            'payload': self.__payload
-        })
-        self.signature = crypto_helper.sign(private_key, data)
+        self.signature = crypto_helper.sign(private_key, self.get_signing_message())
 
     def __eq__(self, other):
         if not other:
@@ -63,13 +70,47 @@ class Transaction:
         :param public_key: Public key of the signer in the string format.
         :param payload: JSON of the data to be signed.
         :param result: Receeives result of transaction validation.
+        Successful validations are remembered in the VerificationCache.
         """
-        data = json.dumps({
-            'sender': self.__sender,
-            'receiver': self.__receiver,
-            'payload': self.__payload
-        })
-        return crypto_helper.validate(self.sender, data, self.signature)
+        verification_cache = VerificationCache.instance()
+        transaction_hash = self.get_hash(crypto_helper)
+        if verification_cache.is_verified(transaction_hash, self.signature):
+            return True
+        result = crypto_helper.validate(self.sender, self.get_signing_message(),
+                                        self.signature)
+        if result:
+            verification_cache.add(transaction_hash, self.signature)
+        return result
+
+    def get_hash(self, crypto_helper):
+        """Returns the hash of the transaction, computes and sets it if
+        it is not set yet."""
+        if not self.__transaction_hash:
+            self.__transaction_hash = Utility.pack_hash(crypto_helper.hash(self.get_json()))
+        transaction_hash = self.__transaction_hash
+        # inlined Utility.unpack_hash, this is called on every pool operation
+        return transaction_hash.hex() if type(transaction_hash) is bytes else transaction_hash
+
+    def get_signing_message(self):
+        """JSON of the data covered by the signature."""
+        if self.__signing_message is None:
+            self.__signing_message = json.dumps({
+                'sender': self.__sender,
+                'receiver': self.__receiver,
+                'payload': self.__payload
+            })
+        return self.__signing_message
+
+    def __getstate__(self):
+        """Pickles the data and hash, not the cached JSON"""
+        return (self.__sender, self.__receiver, self.__payload,
+                self.__signature, self.__transaction_hash)
+
+    def __setstate__(self, state):
+        (self.__sender, self.__receiver, self.__payload,
+         self.__signature, self.__transaction_hash) = state
+        self.__json = None
+        self.__signing_message = None
 
     def __str__(self):
         return str(self.to_dict())
@@ -95,24 +136,28 @@ class Transaction:
         if self.__signature:
             raise ValueError('signature is already set')
         self.__signature = signature
+        self.__json = None
+        self.__transaction_hash = None
 
     @property
     def transaction_hash(self):
-        return self.__transaction_hash
+        transaction_hash = self.__transaction_hash
+        return transaction_hash.hex() if type(transaction_hash) is bytes else transaction_hash
 
     @transaction_hash.setter
     def transaction_hash(self, transaction_hash):
-        if self.__transaction_hash:
+        transaction_hash = Utility.pack_hash(transaction_hash)
+        if self.__transaction_hash and self.__transaction_hash != transaction_hash:
             raise ValueError('transaction_hash is already set')
         self.__transaction_hash = transaction_hash
 
     def __hash__(self):
-        if self.__transaction_hash:
-            return int(self.__transaction_hash, 16)
-        else:
-            raise NoHashError("Transaction has no hash")
+        # consistent with __eq__ and independent of the crypto helper
+        return hash((self.get_signing_message(), self.__signature))
 
 
 class NoHashError(Exception):
+    """Kept for compatibility, transactions are always hashable."""
+
     def __init__(self, message):
         self.message = message
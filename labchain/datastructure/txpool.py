@@ -1,16 +1,72 @@
+from collections import OrderedDict
+import heapq
+import json
 import logging
+import threading
 
 from labchain.datastructure.transaction import Transaction
 
 
 class TxPool:
+    """Pool of the transactions waiting to be mined.
+    The transactions are kept in an insertion ordered dictionary keyed by
+    their hash, so admission, lookup and removal take constant time.
+    Transactions are handed to the miner by priority, i.e. by the fee
+    given in their payload, older transactions first if the fee is the
+    same. When a limit of the pool is reached the transactions with the
+    lowest priority are evicted.
+    Each sender has its own queue, so the number of pending transactions
+    per sender can be limited and blocks can be filled from all senders
+    in turn.
+    """
     _singleton = None
     _first_time = True
 
     def __init__(self, crypto_helper_obj):
+        """Constructor for TxPool, a singleton which is initialized once
+
+        Attributes
+        ----------
+        _transactions : OrderedDict
+            key = transaction hash, value = transaction, oldest first
+        _entries : Dictionary
+            key = transaction hash, value = (priority, sequence number,
+            size in bytes) of the transaction
+        _best_heap : List
+            Heap of (-priority, sequence number, hash) to select the
+            transactions to be mined
+        _worst_heap : List
+            Heap of (priority, -sequence number, hash) to select the
+            transactions to be evicted
+            Entries of removed transactions are dropped from the heaps
+            lazily
+        _max_transactions : Int
+            Maximum number of transactions in the pool, None if unlimited
+        _max_bytes : Int
+            Maximum size of the JSON of all transactions in the pool, None
+            if unlimited
+        _sender_transactions : Dictionary
+            key = sender, value = set of the hashes of its transactions
+        _sender_heaps : Dictionary
+            key = sender, value = heap like _best_heap of its transactions
+        _max_per_sender : Int
+            Maximum number of transactions of a single sender, None if
+            unlimited
+        """
         #  Note: Re-look this logic again later
         if self._first_time:
-            self._transactions = []
+            self._transactions = OrderedDict()
+            self._entries = {}
+            self._best_heap = []
+            self._worst_heap = []
+            self._sequence = 0
+            self._total_bytes = 0
+            self._max_transactions = None
+            self._max_bytes = None
+            self._sender_transactions = {}
+            self._sender_heaps = {}
+            self._max_per_sender = None
+            self._lock = threading.RLock()
             self._crypto_helper = crypto_helper_obj
             self._first_time = False
 
@@ -19,47 +75,250 @@ class TxPool:
             cls._singleton = object.__new__(TxPool)
         return cls._singleton
 
+    def set_limits(self, max_transactions=None, max_bytes=None,
+                   max_per_sender=None):
+        """Sets the maximum number of transactions, the maximum size in
+        bytes of the pool and the maximum number of transactions of a
+        single sender, None for no limit. Transactions exceeding the new
+        limits are evicted."""
+        with self._lock:
+            self._max_transactions = max_transactions
+            self._max_bytes = max_bytes
+            self._max_per_sender = max_per_sender
+            if max_per_sender is not None:
+                for hashes in list(self._sender_transactions.values()):
+                    excess = len(hashes) - max_per_sender
+                    if excess > 0:
+                        worst = sorted(hashes, key=lambda h: (self._entries[h][0],
+                                                              -self._entries[h][1]))
+                        for transaction_hash in worst[:excess]:
+                            self._remove(transaction_hash)
+            while self._transactions and self._is_over_limit(0, 0):
+                self._remove(self._pop_heap(self._worst_heap))
+
+    @staticmethod
+    def get_priority(transaction):
+        """Returns the fee (or priority) given in the payload of the
+        transaction, if the payload is a JSON object. 0 otherwise."""
+        payload = transaction.payload
+        if isinstance(payload, str):
+            try:
+                payload = json.loads(payload)
+            except ValueError:
+                return 0
+        if not isinstance(payload, dict):
+            return 0
+        priority = payload.get('fee', payload.get('priority', 0))
+        if isinstance(priority, bool) or not isinstance(priority, (int, float)):
+            return 0
+        return priority
+
+    def _is_over_limit(self, extra_transactions, extra_bytes):
+        return (self._max_transactions is not None and
+                len(self._transactions) + extra_transactions > self._max_transactions) or \
+               (self._max_bytes is not None and
+                self._total_bytes + extra_bytes > self._max_bytes)
+
+    def _pop_heap(self, heap):
+        """Pops entries of removed transactions from the heap, returns the
+        hash of the transaction on top without removing it"""
+        while heap:
+            transaction_hash = heap[0][2]
+            entry = self._entries.get(transaction_hash)
+            if entry is not None and abs(heap[0][1]) == entry[1]:
+                return transaction_hash
+            heapq.heappop(heap)
+        return None
+
+    def _add(self, transaction_hash, transaction, priority, size):
+        self._sequence += 1
+        self._transactions[transaction_hash] = transaction
+        self._entries[transaction_hash] = (priority, self._sequence, size)
+        self._total_bytes += size
+        heapq.heappush(self._best_heap, (-priority, self._sequence, transaction_hash))
+        heapq.heappush(self._worst_heap, (priority, -self._sequence, transaction_hash))
+        hashes = self._sender_transactions.setdefault(transaction.sender, set())
+        hashes.add(transaction_hash)
+        sender_heap = self._sender_heaps.setdefault(transaction.sender, [])
+        heapq.heappush(sender_heap, (-priority, self._sequence, transaction_hash))
+        if len(sender_heap) > 2 * len(hashes) + 16:
+            sender_heap[:] = [(-self._entries[h][0], self._entries[h][1], h) for h in hashes]
+            heapq.heapify(sender_heap)
+        if max(len(self._best_heap), len(self._worst_heap)) > \
+                2 * len(self._entries) + 16:
+            # drop the entries of removed transactions to keep the heaps small
+            self._best_heap = [(-p, s, h) for h, (p, s, _) in self._entries.items()]
+            self._worst_heap = [(p, -s, h) for h, (p, s, _) in self._entries.items()]
+            heapq.heapify(self._best_heap)
+            heapq.heapify(self._worst_heap)
+
+    def _remove(self, transaction_hash):
+        transaction = self._transactions.pop(transaction_hash, None)
+        if transaction is not None:
+            self._total_bytes -= self._entries.pop(transaction_hash)[2]
+            hashes = self._sender_transactions[transaction.sender]
+            hashes.discard(transaction_hash)
+            if not hashes:
+                del self._sender_transactions[transaction.sender]
+                del self._sender_heaps[transaction.sender]
+        return transaction
+
     def get_transaction(self):
-        return self._transactions.pop()
+        """Removes and returns the latest transaction"""
+        with self._lock:
+            if not self._transactions:
+                raise IndexError('pop from empty transaction pool')
+            return self._remove(next(reversed(self._transactions)))
 
     def get_transaction_by_hash(self, transaction_hash):
         """tuple with 1st element as transaction and 2nd element as block_hash"""
-        for transaction in self._transactions:
-            if transaction.transaction_hash == transaction_hash:
-                return (transaction, None)
+        transaction = self._transactions.get(transaction_hash)
+        if transaction is not None:
+            return (transaction, None)
         return None, None
 
     def get_transactions(self, count, remove_result=True):
-        transactions = self._transactions[:count]
-        if remove_result:
-            self._transactions = self._transactions[count:]
-        return transactions
+        """Returns the count transactions with the highest priority, older
+        ones first if the priority is the same. They are removed from the
+        pool if remove_result is set"""
+        with self._lock:
+            count = max(min(count, len(self._transactions)), 0)
+            if not remove_result:
+                return [self._transactions[h] for _, _, h in heapq.nsmallest(
+                    count, ((-p, s, h) for h, (p, s, _) in self._entries.items()))]
+            transactions = []
+            for _ in range(count):
+                transactions.append(self._remove(self._pop_heap(self._best_heap)))
+            return transactions
+
+    def get_transactions_round_robin(self, count):
+        """Removes and returns up to count transactions, taking one
+        transaction of each sender in turn, so a single sender can not
+        fill the block. Each round takes the best transaction of every
+        sender, ordered by priority and age.
+        """
+        with self._lock:
+            # (turn, -priority, sequence number, hash, sender) of the next
+            # transaction of each sender
+            turns = []
+            for sender, sender_heap in self._sender_heaps.items():
+                self._pop_heap(sender_heap)
+                turns.append((0,) + sender_heap[0] + (sender,))
+            heapq.heapify(turns)
+            transactions = []
+            while turns and len(transactions) < count:
+                turn, _, _, transaction_hash, sender = heapq.heappop(turns)
+                transactions.append(self._remove(transaction_hash))
+                if sender in self._sender_heaps:
+                    sender_heap = self._sender_heaps[sender]
+                    self._pop_heap(sender_heap)
+                    heapq.heappush(turns, (turn + 1,) + sender_heap[0] + (sender,))
+            return transactions
 
     def remove_transaction(self, transaction):
-        if transaction in self._transactions:
-            self._transactions.remove(transaction)
-            return True
-        return False
+        with self._lock:
+            return self._remove(transaction.get_hash(self._crypto_helper)) is not None
 
     def add_transaction_if_not_exist(self, transaction):
         if isinstance(transaction, Transaction):
-            if transaction not in self._transactions and \
+            transaction_hash = transaction.get_hash(self._crypto_helper)
+            if transaction_hash not in self._transactions and \
                     transaction.validate_transaction(self._crypto_helper):
-                if not transaction.transaction_hash:
-                    hash_val = self._crypto_helper.hash(transaction.get_json())
-                    transaction.transaction_hash = hash_val
-                self._transactions.append(transaction)
+                with self._lock:
+                    if not self._insert(transaction_hash, transaction):
+                        return False
                 logging.info('Added transaction to pool: {}'.format(transaction))
                 return True
             else:
                 return False
         return False
 
+    def add_transactions(self, transactions, verification_engine=None):
+        """Adds several transactions at once. Transactions already in the
+        pool are skipped before their signatures are verified.
+
+        Parameters
+        ----------
+        transactions : List
+            Transactions to be added
+        verification_engine : VerificationEngine
+            Engine verifying the signatures of all transactions together,
+            None to verify them one by one
+
+        Returns
+        -------
+        List
+            The transactions added to the pool
+        """
+        candidates = {}
+        for transaction in transactions:
+            if isinstance(transaction, Transaction):
+                transaction_hash = transaction.get_hash(self._crypto_helper)
+                if transaction_hash not in self._transactions:
+                    candidates.setdefault(transaction_hash, transaction)
+        candidates = list(candidates.items())
+        if verification_engine is not None:
+            valid = verification_engine.verify_transactions(
+                [transaction for _, transaction in candidates])
+        else:
+            valid = [transaction.validate_transaction(self._crypto_helper)
+                     for _, transaction in candidates]
+        added = []
+        with self._lock:
+            for (transaction_hash, transaction), is_valid in zip(candidates, valid):
+                if is_valid and self._insert(transaction_hash, transaction):
+                    added.append(transaction)
+        logging.info('Added {} of {} transactions to pool'
+                     .format(len(added), len(transactions)))
+        return added
+
+    def _insert(self, transaction_hash, transaction):
+        """Adds a verified transaction if it is new and fits into the
+        pool, the lock must be held"""
+        priority = self.get_priority(transaction)
+        size = len(transaction.get_json())
+        if transaction_hash in self._transactions or \
+                self._is_sender_full(transaction.sender) or \
+                not self._make_room(priority, size):
+            return False
+        self._add(transaction_hash, transaction, priority, size)
+        return True
+
+    def _is_sender_full(self, sender):
+        return self._max_per_sender is not None and \
+            len(self._sender_transactions.get(sender, ())) >= self._max_per_sender
+
+    def _make_room(self, priority, size):
+        """Evicts the transactions with the lowest priority until a
+        transaction of the given priority and size fits into the pool.
+        Returns False if it does not fit without evicting transactions of
+        the same or a higher priority, or not even in the empty pool."""
+        if self._max_bytes is not None and size > self._max_bytes:
+            return False
+        candidates = []
+        freed_bytes = 0
+        while self._is_over_limit(1 - len(candidates), size - freed_bytes):
+            transaction_hash = self._pop_heap(self._worst_heap)
+            entry = self._entries.get(transaction_hash)
+            if entry is None or entry[0] >= priority:
+                for candidate in candidates:
+                    heapq.heappush(self._worst_heap, candidate)
+                return False
+            candidates.append(heapq.heappop(self._worst_heap))
+            freed_bytes += entry[2]
+        for _, _, transaction_hash in candidates:
+            self._remove(transaction_hash)
+            logging.info('Evicted transaction from pool: {}'.format(transaction_hash))
+        return True
+
     def get_transaction_count(self):
         return len(self._transactions)
 
+    def get_size_in_bytes(self):
+        return self._total_bytes
+
     def return_transactions_to_pool(self, transactions):
         status = True
         for transaction in transactions:
-            status = status and self.add_transaction_if_not_exist(transaction)
+            status = self.add_transaction_if_not_exist(transaction) and status
         return status
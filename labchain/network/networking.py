@@ -21,6 +21,10 @@ from labchain.util.utility import Utility
 logger = logging.getLogger(__name__)
 
 HTTP_BAD_REQUEST = 400
+# Largest page of transactions served by requestTransactionsPage
+MAX_TRANSACTIONS_PAGE_SIZE = 1000
+# Seconds to wait for a peer to answer a request
+RPC_TIMEOUT_SEC = 30
 
 
 class NodeNotAvailableException(Exception):
@@ -60,8 +64,12 @@ def update(d, u):
 class JsonRpcClient:
     """Handle outgoing JSON-RPC calls."""
 
-    def __init__(self):
+    def __init__(self, timeout=RPC_TIMEOUT_SEC):
+        """
+        :param timeout: Seconds to wait for a peer to answer, None to wait forever.
+        """
         self.id_counter = 0
+        self.timeout = timeout
 
     def send(self, ip_address, port, method, params=tuple()):
         """Convert data to json and send it over the network.
@@ -79,10 +87,13 @@ class JsonRpcClient:
         logger.debug('Sending request {} to {}'.format(str(payload), url))
         try:
             response = requests.post(url, data=json.dumps(payload),
-                                     headers=headers).json()
+                                     headers=headers, timeout=self.timeout).json()
         except (requests.exceptions.ConnectionError,
                 requests.exceptions.Timeout) as e:
             raise NodeNotAvailableException(str(e))
+        except ValueError as e:
+            raise UnexpectedResponseException('Invalid response from {}: {}'
+                                              .format(url, e))
         logger.debug('Received response {} from {}'.format(response, url))
         self.id_counter += 1
         try:
@@ -112,6 +123,12 @@ class NetworkInterface:
         if not responses:
             raise NoPeersException('No nodes available to send the transaction to')
 
+    def sendTransactions(self, transactions):
+        # send several transactions to all peers in one request
+        responses = self._bulk_send('sendTransactions', [[transaction.to_dict() for transaction in transactions]])
+        if not responses:
+            raise NoPeersException('No nodes available to send the transactions to')
+
     def sendBlock(self, block):
         # send the block to all peers
         responses = self._bulk_send('sendBlock', [block.to_dict()])
@@ -170,17 +187,71 @@ class NetworkInterface:
             raise NoPeersException('No nodes available to request the block from')
         return res
 
-    def requestTransactionReceived(self, public_key):
-        """Returns the tuple (transaction, block hash of transaction)."""
-        responses = self._bulk_send('requestTransactionReceived', [public_key], return_on_first_success=False)
+    def requestMerkleProof(self, transaction_hash):
+        """Returns the proof that the transaction is included in a block.
+
+        The dict contains the keys blockHash, merkleHash, transactionHash and
+        proof, it can be checked with MerkleTree.verify_proof.
+        """
+        responses = self._bulk_send('requestMerkleProof', [transaction_hash], return_on_first_success=True)
+        if responses:
+            if responses[0]:
+                return responses[0]
+            else:
+                raise TransactionDoesNotExistException()
+        else:
+            raise NoPeersException('No nodes available to request the proof from')
+
+    def requestTransactionReceived(self, public_key, offset=0, limit=None):
+        """Returns a list of the transactions received by public_key.
+
+        offset and limit select a page of the address history.
+        """
+        return self._request_transaction_list('requestTransactionReceived', [public_key, offset, limit])
+
+    def requestTransactionSent(self, public_key, offset=0, limit=None):
+        """Returns a list of the transactions sent by public_key.
+
+        offset and limit select a page of the address history.
+        """
+        return self._request_transaction_list('requestTransactionSent', [public_key, offset, limit])
+
+    def requestAllTransactions(self):
+        """Returns a list of all transactions in the blockchain of the connected node."""
+        return self._request_transaction_list('requestAllTransactions', [])
+
+    def requestTransactionsPage(self, cursor=None, limit=100):
+        """Returns a page of the transactions in the blockchain of the connected node.
+
+        Returns a tuple of the transactions and the cursor of the next page, which is None after the last page.
+        """
+        responses = self._bulk_send('requestTransactionsPage', [cursor, limit], return_on_first_success=True)
+        if responses:
+            if responses[0]:
+                return [Transaction.from_dict(tx) for tx in responses[0]['transactions']], responses[0]['cursor']
+            else:
+                raise TransactionDoesNotExistException()
+        else:
+            raise NoPeersException('No nodes available to request the transactions from')
+
+    def iterAllTransactions(self, page_size=100):
+        """Yields all transactions in the blockchain of the connected node, requesting one page at a time."""
+        cursor = None
+        while True:
+            transactions, cursor = self.requestTransactionsPage(cursor, page_size)
+            for transaction in transactions:
+                yield transaction
+            if cursor is None:
+                return
+
+    def _request_transaction_list(self, method, params):
+        responses = self._bulk_send(method, params, return_on_first_success=True)
 
         res = []
         if responses:
             if len(responses) > 0:
                 for tx in responses[0]:
                     res.append(Transaction.from_dict(tx))
-                #transaction, block_hash = responses[0]
-                #return Transaction.from_dict(transaction), block_hash
             else:
                 raise TransactionDoesNotExistException()
         else:
@@ -309,7 +380,13 @@ class ServerNetworkInterface(NetworkInterface):
                  get_transactions_in_pool,
                  get_n_last_transactions_callback,
                  get_transaction_received_callback,
-                 port=8080, block_cache_size=1000, transaction_cache_size=1000):
+                 port=8080, block_cache_size=1000, transaction_cache_size=1000,
+                 get_transaction_sent_callback=None,
+                 get_all_transactions_callback=None,
+                 get_block_json_by_hash_callback=None,
+                 get_merkle_proof_callback=None,
+                 get_transactions_page_callback=None,
+                 submit_transaction_callback=None):
         """
         :param json_rpc_client: A JsonRpcClient instance.
         :param initial_peers: A dict structured like {'<ip1>': {'port': <port1>}, ...}.
@@ -319,6 +396,20 @@ class ServerNetworkInterface(NetworkInterface):
         :param get_transaction_callback: A callable that gets a transaction hash and returns the corresponding
                                             Transaction instance or None.
         :param get_n_last_transactions_callback: A callable that get n last mined transactions from blockchain
+        :param get_transaction_received_callback: A callable that gets an address, an offset and a limit and
+                                                    returns the transactions received by the address.
+        :param get_transaction_sent_callback: A callable that gets an address, an offset and a limit and
+                                                returns the transactions sent by the address.
+        :param get_all_transactions_callback: A callable that returns all transactions in the blockchain.
+        :param get_block_json_by_hash_callback: A callable that gets a block hash and returns the JSON string of
+                                                  the block or None. If given, it serves requestBlockByHash.
+        :param get_merkle_proof_callback: A callable that gets a transaction hash and returns the inclusion proof
+                                            of the transaction in the blockchain or None.
+        :param get_transactions_page_callback: A callable that gets a cursor and a limit and returns a tuple of the
+                                                 transactions of the page and the cursor of the next page or None.
+        :param submit_transaction_callback: A callable accepting a Transaction instance, which queues it for
+                                              admission and returns True if it was queued. If given, received
+                                              transactions are acknowledged without waiting for their admission.
         :param port: The port number to listen on.
         """
         super().__init__(json_rpc_client, initial_peers)
@@ -337,6 +428,12 @@ class ServerNetworkInterface(NetworkInterface):
         self.transaction_cache = []
         self.transaction_cache_size = transaction_cache_size
         self.get_transaction_received_callback = get_transaction_received_callback
+        self.get_transaction_sent_callback = get_transaction_sent_callback
+        self.get_all_transactions_callback = get_all_transactions_callback
+        self.get_block_json_by_hash_callback = get_block_json_by_hash_callback
+        self.get_merkle_proof_callback = get_merkle_proof_callback
+        self.get_transactions_page_callback = get_transactions_page_callback
+        self.submit_transaction_callback = submit_transaction_callback
 
     def update_peer_lists(self):
         """Get new peer lists from all peers."""
@@ -378,6 +475,7 @@ class ServerNetworkInterface(NetworkInterface):
         dispatcher['advertisePeer'] = self.__handle_advertise_peer
         dispatcher['sendBlock'] = self.__handle_send_block
         dispatcher['sendTransaction'] = self.__handle_send_transaction
+        dispatcher['sendTransactions'] = self.__handle_send_transactions
         dispatcher['requestBlock'] = self.__handle_request_block
         dispatcher['requestBlockByHash'] = self.__handle_request_block_by_hash
         dispatcher['requestTransaction'] = self.__handle_request_transaction
@@ -385,12 +483,20 @@ class ServerNetworkInterface(NetworkInterface):
         dispatcher['requestTransactionsInPool'] = self.__handle_request_transactions_in_pool
         dispatcher['requestNLastTransaction'] = self.__handle_request_n_last_transaction
         dispatcher['requestTransactionReceived'] = self.__handle_request_transaction_received
+        dispatcher['requestTransactionSent'] = self.__handle_request_transaction_sent
+        dispatcher['requestAllTransactions'] = self.__handle_request_all_transactions
+        dispatcher['requestMerkleProof'] = self.__handle_request_merkle_proof
+        dispatcher['requestTransactionsPage'] = self.__handle_request_transactions_page
 
         # insert IP address of peer if advertise peer is called
         try:
             request_body_dict = json.loads(request.data.decode())
         except ValueError:
             return Response(status=HTTP_BAD_REQUEST)
+        if request_body_dict['method'] == 'requestBlockByHash':
+            response_data = self.__handle_request_block_json_by_hash(request_body_dict)
+            if response_data is not None:
+                return Response(response_data, mimetype='application/json')
         if request_body_dict['method'] == 'advertisePeer':
             if 'params' not in request_body_dict:
                 request_body_dict['params'] = [6666]
@@ -429,6 +535,9 @@ class ServerNetworkInterface(NetworkInterface):
 
     def __handle_send_transaction(self, transaction_data):
         transaction = Transaction.from_dict(transaction_data)
+        if self.submit_transaction_callback:
+            # admitted and broadcast in batches by the admission pipeline
+            return self.submit_transaction_callback(transaction)
         transaction_hash = self.crypto_helper.hash(transaction.get_json())
         transaction_in_pool, _ = self.get_transaction_callback(transaction_hash)
         self.on_transaction_received_callback(transaction)
@@ -443,6 +552,17 @@ class ServerNetworkInterface(NetworkInterface):
             except NoPeersException:
                 pass
 
+    def __handle_send_transactions(self, transactions_data):
+        """Receive several transactions, returns the number of transactions accepted for admission."""
+        accepted = 0
+        for transaction_data in transactions_data:
+            if self.submit_transaction_callback:
+                accepted += bool(self.submit_transaction_callback(Transaction.from_dict(transaction_data)))
+            else:
+                self.__handle_send_transaction(transaction_data)
+                accepted += 1
+        return accepted
+
     def __handle_request_block(self, block_id):
         blocks = self.get_block_callback(block_id)
         if blocks:
@@ -455,6 +575,23 @@ class ServerNetworkInterface(NetworkInterface):
             return block.to_dict()
         return []
 
+    def __handle_request_block_json_by_hash(self, request_body_dict):
+        """Answer requestBlockByHash with the serialized block of the chain.
+
+        The block JSON is embedded as is, so it is not parsed and serialized again.
+        Returns None if the request has to go through the dispatcher.
+        """
+        if self.get_block_json_by_hash_callback is None or 'id' not in request_body_dict:
+            return None
+        params = request_body_dict.get('params')
+        if not isinstance(params, list) or len(params) != 1:
+            return None
+        block_json = self.get_block_json_by_hash_callback(params[0])
+        if not block_json:
+            return None
+        return '{{"jsonrpc": "2.0", "result": {}, "id": {}}}'.format(
+            block_json, json.dumps(request_body_dict['id']))
+
     def __handle_request_blocks_by_hash_range(self, block_hash_start_hash=None, block_hash_end_hash=None):
         blocks = self.get_blocks_by_hash_range_callback(block_hash_start_hash, block_hash_end_hash)
         if blocks:
@@ -479,12 +616,33 @@ class ServerNetworkInterface(NetworkInterface):
             return [transaction.to_dict() for transaction in transactions]
         return []
 
-    def __handle_request_transaction_received(self, public_key):
-        transactions = self.get_transaction_received_callback(public_key)
+    def __handle_request_transaction_received(self, public_key, offset=0, limit=None):
+        transactions = self.get_transaction_received_callback(public_key, offset, limit)
+        if transactions:
+            return [transaction.to_dict() for transaction in transactions]
+        return []
+
+    def __handle_request_transaction_sent(self, public_key, offset=0, limit=None):
+        transactions = self.get_transaction_sent_callback(public_key, offset, limit)
         if transactions:
             return [transaction.to_dict() for transaction in transactions]
         return []
 
+    def __handle_request_all_transactions(self):
+        transactions = self.get_all_transactions_callback()
+        if transactions:
+            return [transaction.to_dict() for transaction in transactions]
+        return []
+
+    def __handle_request_merkle_proof(self, transaction_hash):
+        return self.get_merkle_proof_callback(transaction_hash)
+
+    def __handle_request_transactions_page(self, cursor=None, limit=None):
+        limit = max(1, min(int(limit or MAX_TRANSACTIONS_PAGE_SIZE), MAX_TRANSACTIONS_PAGE_SIZE))
+        transactions, next_cursor = self.get_transactions_page_callback(cursor, limit)
+        return {'transactions': [transaction.to_dict() for transaction in transactions],
+                'cursor': next_cursor}
+
     def __filter_own_address(self, peers):
         """Filter entries with own IP address and port."""
         my_addresses = self.__ip4_addresses() + self.__ip6_addresses()
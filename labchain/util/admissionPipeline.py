@@ -0,0 +1,131 @@
+import logging
+from queue import Queue, Full, Empty
+import threading
+import time
+
+
+class AdmissionPipeline:
+    """Admits incoming transactions in batches.
+    Transactions are queued by the receiving thread, which returns
+    immediately. A worker thread collects them into batches, which are
+    verified and added to the pool at once, and broadcasts the
+    transactions added in one message per batch.
+    """
+
+    def __init__(self, admit_callback, broadcast_callback, batch_size=500,
+                 max_delay=0.05, max_queue_size=100000):
+        """Constructor for AdmissionPipeline
+
+        Parameters
+        ----------
+        admit_callback : Callable
+            Gets a list of transactions, verifies them and adds them to the
+            pool. Returns the list of transactions added
+        broadcast_callback : Callable
+            Gets a list of transactions to be sent to the peers, should
+            return without waiting for the peers
+        batch_size : Int
+            Maximum number of transactions admitted at once
+        max_delay : Float
+            Seconds waited for a batch to fill up after its first
+            transaction was received
+        max_queue_size : Int
+            Maximum number of queued transactions, further transactions are
+            rejected until the queue has room again
+
+        Attributes
+        ----------
+        _queue : Queue
+            Transactions received but not admitted yet
+        _worker : Thread
+            Thread admitting the batches, started by start
+        """
+        self._logger = logging.getLogger(__name__)
+        self._admit_callback = admit_callback
+        self._broadcast_callback = broadcast_callback
+        self._batch_size = batch_size
+        self._max_delay = max_delay
+        self._queue = Queue(max_queue_size)
+        self._worker = None
+        self._stopping = False
+
+    def start(self):
+        """Starts the worker thread"""
+        self._stopping = False
+        self._worker = threading.Thread(name='Transaction Admission',
+                                        target=self._run, daemon=True)
+        self._worker.start()
+
+    def stop(self):
+        """Stops the worker thread once the queued transactions are
+        admitted"""
+        if self._worker is not None:
+            self._queue.put(None)
+            self._worker.join()
+            self._worker = None
+
+    def submit(self, transaction):
+        """Queues the transaction for admission.
+
+        Returns
+        -------
+        Boolean
+            True if the transaction was queued, False if the queue is full
+        """
+        try:
+            self._queue.put_nowait(transaction)
+        except Full:
+            self._logger.warning('Admission queue is full, rejecting '
+                                 'transaction')
+            return False
+        return True
+
+    def get_queue_size(self):
+        return self._queue.qsize()
+
+    def process_batch(self, transactions):
+        """Admits the transactions and broadcasts the ones added.
+        Returns the list of transactions added."""
+        added = self._admit_callback(transactions)
+        self._logger.debug('Admitted {} of {} transactions'
+                           .format(len(added), len(transactions)))
+        if added:
+            try:
+                self._broadcast_callback(added)
+            except Exception as e:
+                self._logger.error('Could not broadcast {} transactions: {}'
+                                   .format(len(added), e))
+        return added
+
+    def _next_batch(self):
+        """Waits for the next batch, None once the pipeline is stopped"""
+        transaction = self._queue.get()
+        if transaction is None:
+            return None
+        batch = [transaction]
+        deadline = time.time() + self._max_delay
+        while len(batch) < self._batch_size:
+            timeout = deadline - time.time()
+            if timeout <= 0:
+                break
+            try:
+                transaction = self._queue.get(timeout=timeout)
+            except Empty:
+                break
+            if transaction is None:
+                # admit this batch, then stop
+                self._stopping = True
+                break
+            batch.append(transaction)
+        return batch
+
+    def _run(self):
+        while not self._stopping:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            try:
+                self.process_batch(batch)
+            except Exception as e:
+                self._logger.error('Could not admit {} transactions: {}'
+                                   .format(len(batch), e))
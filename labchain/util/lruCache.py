@@ -0,0 +1,58 @@
+from collections import OrderedDict
+import threading
+
+
+class LRUCache:
+    """Bounded mapping which evicts the least recently used entry when
+    full. Safe to use from several threads.
+    """
+
+    def __init__(self, max_size):
+        """Constructor for LRUCache
+
+        Parameters
+        ----------
+        max_size : Int
+            Maximum number of entries kept in the cache
+
+        """
+        self._max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        """Returns the value cached for key and marks it as recently used,
+        default if key is not cached"""
+        with self._lock:
+            try:
+                self._entries.move_to_end(key)
+            except KeyError:
+                return default
+            return self._entries[key]
+
+    def put(self, key, value):
+        """Caches the value for key, evicting the least recently used
+        entry if the cache is full"""
+        if self._max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+
+    def remove(self, key):
+        """Removes key from the cache if present"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Removes all entries from the cache"""
+        with self._lock:
+            self._entries.clear()
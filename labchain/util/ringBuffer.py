@@ -0,0 +1,74 @@
+import threading
+
+
+class RingBuffer:
+    """Bounded sequence which overwrites the oldest item when full.
+    Safe to use from several threads.
+    """
+
+    def __init__(self, capacity):
+        """Constructor for RingBuffer
+
+        Parameters
+        ----------
+        capacity : Int
+            Maximum number of items kept in the buffer
+
+        Attributes
+        ----------
+        _items : List
+            Fixed size storage of the items
+        _start : Int
+            Index of the oldest item in _items
+        _size : Int
+            Number of items in the buffer
+        """
+        self._capacity = max(capacity, 0)
+        self._items = [None] * self._capacity
+        self._start = 0
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def capacity(self):
+        return self._capacity
+
+    def append(self, item):
+        """Adds the item as the newest one, overwriting the oldest item if
+        the buffer is full"""
+        with self._lock:
+            self._append(item)
+
+    def extend(self, items):
+        """Adds the items in the given order, the last one is the newest.
+        Readers see either none or all of the items."""
+        with self._lock:
+            for item in items:
+                self._append(item)
+
+    def _append(self, item):
+        if self._capacity == 0:
+            return
+        self._items[(self._start + self._size) % self._capacity] = item
+        if self._size < self._capacity:
+            self._size += 1
+        else:
+            self._start = (self._start + 1) % self._capacity
+
+    def clear(self):
+        """Removes all items from the buffer"""
+        with self._lock:
+            self._items = [None] * self._capacity
+            self._start = 0
+            self._size = 0
+
+    def latest(self, n):
+        """Returns the n newest items, newest first"""
+        with self._lock:
+            n = max(min(n, self._size), 0)
+            end = self._start + self._size
+            return [self._items[i % self._capacity]
+                    for i in range(end - 1, end - 1 - n, -1)]
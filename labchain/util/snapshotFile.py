@@ -0,0 +1,86 @@
+from hashlib import sha256
+import logging
+import os
+
+# Written in front of every snapshot, changes with the file format
+SNAPSHOT_MAGIC = b'LABCHAIN-SNAPSHOT-1\n'
+
+
+class SnapshotFile:
+    """Stores a binary snapshot on disk along with its SHA-256 checksum.
+    Snapshots are written to a temporary file which replaces the previous
+    snapshot, so a crash while writing never leaves a partial snapshot.
+    The checksum protects against corrupted files, not against tampering.
+    """
+
+    def __init__(self, path):
+        """Constructor for SnapshotFile
+
+        Parameters
+        ----------
+        path : String
+            Path of the snapshot file
+        """
+        self._logger = logging.getLogger(__name__)
+        self._path = path
+
+    @property
+    def path(self):
+        return self._path
+
+    def save(self, data):
+        """Writes the snapshot atomically.
+
+        Parameters
+        ----------
+        data : Bytes
+            Content of the snapshot
+
+        Returns
+        -------
+        Boolean
+            True if the snapshot was written
+        """
+        tmp_path = self._path + '.tmp'
+        try:
+            with open(tmp_path, 'wb') as snapshot_file:
+                snapshot_file.write(SNAPSHOT_MAGIC)
+                snapshot_file.write(sha256(data).digest())
+                snapshot_file.write(data)
+                snapshot_file.flush()
+                os.fsync(snapshot_file.fileno())
+            os.replace(tmp_path, self._path)
+        except OSError as e:
+            self._logger.error('Could not write snapshot {}: {}'
+                               .format(self._path, e))
+            return False
+        return True
+
+    def load(self):
+        """Reads the snapshot and verifies its checksum.
+
+        Returns
+        -------
+        Bytes
+            Content of the snapshot, None if there is no valid snapshot
+        """
+        try:
+            with open(self._path, 'rb') as snapshot_file:
+                content = snapshot_file.read()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            self._logger.error('Could not read snapshot {}: {}'
+                               .format(self._path, e))
+            return None
+        header_size = len(SNAPSHOT_MAGIC) + sha256().digest_size
+        if not content.startswith(SNAPSHOT_MAGIC) or len(content) < header_size:
+            self._logger.warning('Ignoring snapshot {} of unknown format'
+                                 .format(self._path))
+            return None
+        data = content[header_size:]
+        if sha256(data).digest() != content[len(SNAPSHOT_MAGIC):header_size]:
+            self._logger.warning('Ignoring snapshot {} with wrong checksum'
+                                 .format(self._path))
+            return None
+        return data
@@ -32,6 +32,27 @@ class Utility:
     def __iter__(self):
         pass
 
+    @staticmethod
+    def pack_hash(hash_value):
+        """Returns a hex encoded hash as bytes, which take half the memory.
+        Values which are not lowercase hex strings are returned unchanged.
+        """
+        if isinstance(hash_value, str):
+            try:
+                packed = bytes.fromhex(hash_value)
+            except ValueError:
+                return hash_value
+            if packed.hex() == hash_value:
+                return packed
+        return hash_value
+
+    @staticmethod
+    def unpack_hash(hash_value):
+        """Returns the hex string of a hash packed with pack_hash"""
+        if isinstance(hash_value, bytes):
+            return hash_value.hex()
+        return hash_value
+
     @staticmethod
     def is_json(object_param):
         try:
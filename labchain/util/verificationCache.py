@@ -0,0 +1,51 @@
+import threading
+
+from labchain.util.lruCache import LRUCache
+from labchain.util.singleton import Singleton
+
+# Number of verified signatures remembered if not configured otherwise
+DEFAULT_CACHE_SIZE = 100000
+
+
+@Singleton
+class VerificationCache:
+    """Remembers the successfully verified transaction signatures, so each
+    signature is checked once no matter how often the transaction is
+    validated by the pool or in blocks.
+    In order to use the VerificationCache, please use VerificationCache.instance()
+    """
+
+    def __init__(self):
+        self._verified = LRUCache(DEFAULT_CACHE_SIZE)
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def set_max_size(self, max_size):
+        """Sets the number of signatures remembered, clears the cache"""
+        self._verified = LRUCache(max_size)
+
+    def is_verified(self, transaction_hash, signature):
+        """Checks whether the signature of the transaction was verified"""
+        verified = self._verified.get((transaction_hash, signature), False)
+        with self._lock:
+            if verified:
+                self._hits += 1
+            else:
+                self._misses += 1
+        return verified
+
+    def add(self, transaction_hash, signature):
+        """Remembers the signature of the transaction as valid"""
+        self._verified.put((transaction_hash, signature), True)
+
+    def get_stats(self):
+        """Returns the hits, misses and hit rate of the cache"""
+        with self._lock:
+            hits = self._hits
+            misses = self._misses
+        total = hits + misses
+        return {'hits': hits,
+                'misses': misses,
+                'hit_rate': float(hits) / total if total else 0.0,
+                'size': len(self._verified)}
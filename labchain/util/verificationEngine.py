@@ -0,0 +1,129 @@
+from concurrent.futures import ProcessPoolExecutor
+import logging
+import multiprocessing
+import os
+import threading
+
+from labchain.util.cryptoHelper import CryptoHelper
+from labchain.util.verificationCache import VerificationCache
+
+
+def _verify_signatures(signatures):
+    """Verifies a chunk of signatures in a worker process.
+
+    Parameters
+    ----------
+    signatures : List
+        (public key, signed message, signature) tuples
+
+    Returns
+    -------
+    List of Booleans, True for each valid signature
+    """
+    crypto_helper = CryptoHelper.instance()
+    return [crypto_helper.validate(pub_key, message, signature)
+            for pub_key, message, signature in signatures]
+
+
+class VerificationEngine:
+    """Verifies transaction signatures on all cores using a process pool.
+    Small batches are verified in the calling thread, since sending them
+    to the worker processes costs more than verifying them directly.
+    Signatures found in the VerificationCache are not verified again.
+    """
+
+    def __init__(self, num_of_workers=None, min_parallel_transactions=32):
+        """Constructor for VerificationEngine
+
+        Parameters
+        ----------
+        num_of_workers : Int
+            Number of worker processes, number of cores if None or 0
+        min_parallel_transactions : Int
+            Minimum number of signatures verified by the worker processes,
+            smaller batches are verified in the calling thread
+
+        Attributes
+        ----------
+        _executor : ProcessPoolExecutor
+            Pool of the worker processes, started by start or on first use.
+            The workers are spawned, not forked, since the node forks
+            while other threads hold locks which would never be released
+            in the workers
+        """
+        self._logger = logging.getLogger(__name__)
+        self._num_of_workers = num_of_workers or os.cpu_count() or 1
+        self._min_parallel_transactions = min_parallel_transactions
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def start(self):
+        """Starts the worker processes, unless all signatures are verified
+        in the calling thread"""
+        if self._num_of_workers >= 2:
+            self._get_executor()
+
+    def _get_executor(self):
+        with self._executor_lock:
+            if self._executor is None:
+                self._logger.debug("Starting {} verification workers"
+                                   .format(self._num_of_workers))
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self._num_of_workers,
+                    mp_context=multiprocessing.get_context('spawn'))
+            return self._executor
+
+    def verify_transactions(self, transactions):
+        """Verifies the signatures of the given transactions.
+
+        Returns
+        -------
+        List of Booleans, True for each transaction with a valid signature
+        """
+        crypto_helper = CryptoHelper.instance()
+        verification_cache = VerificationCache.instance()
+        results = [True] * len(transactions)
+        unverified = [i for i, t in enumerate(transactions)
+                      if not verification_cache.is_verified(
+                          t.get_hash(crypto_helper), t.signature)]
+        signatures = [(transactions[i].sender,
+                       transactions[i].get_signing_message(),
+                       transactions[i].signature) for i in unverified]
+        if self._num_of_workers < 2 or \
+                len(signatures) < self._min_parallel_transactions:
+            signature_results = _verify_signatures(signatures)
+        else:
+            chunk_size = -(-len(signatures) // self._num_of_workers)
+            chunks = [signatures[i:i + chunk_size]
+                      for i in range(0, len(signatures), chunk_size)]
+            signature_results = []
+            for chunk_results in self._get_executor().map(_verify_signatures, chunks):
+                signature_results.extend(chunk_results)
+
+        for i, valid in zip(unverified, signature_results):
+            results[i] = valid
+            if valid:
+                verification_cache.add(transactions[i].transaction_hash,
+                                       transactions[i].signature)
+        return results
+
+    def verify_blocks(self, blocks):
+        """Verifies the transaction signatures of several blocks at once.
+
+        Returns
+        -------
+        List of Booleans, True for each block whose signatures are all valid
+        """
+        transactions = []
+        for block in blocks:
+            transactions.extend(block.transactions or [])
+        results = iter(self.verify_transactions(transactions))
+        return [all([next(results) for _ in block.transactions or []])
+                for block in blocks]
+
+    def shutdown(self):
+        """Stops the worker processes"""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
@@ -1,4 +1,5 @@
 import argparse
+import atexit
 import logging
 import os
 import socket
@@ -91,3 +92,4 @@ if __name__ == '__main__':
     Utility.print_labchain_logo()
 
     node = create_node(args.port, initial_peers)
+    atexit.register(node.stop)
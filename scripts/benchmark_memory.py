@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+"""Measures the memory footprint of transactions and blocks.
+
+Creates many Transaction and LogicalBlock instances with realistic field
+sizes and reports the average number of bytes allocated per object,
+strings shared by all objects excluded. The same objects are measured in
+the layout used before __slots__ and packed hashes, i.e. with an instance
+dictionary and hex string hashes.
+
+The hashes are stored packed and converted to hex strings on every
+access. The time of single accesses and of a round trip through the
+transaction pool, which accesses the hashes on every step, is reported
+for packed and for hex string hashes as well.
+
+Usage: python scripts/benchmark_memory.py [number of objects]
+"""
+from hashlib import sha256
+import logging
+import os
+import sys
+import time
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from labchain.datastructure.block import LogicalBlock  # noqa: E402
+from labchain.datastructure.transaction import Transaction  # noqa: E402
+from labchain.datastructure.txpool import TxPool  # noqa: E402
+from labchain.util.cryptoHelper import CryptoHelper  # noqa: E402
+
+SENDER = 'S' * 240
+RECEIVER = 'R' * 240
+PAYLOAD = 'payload'
+SIGNATURE = 'G' * 88
+
+
+def _hex_hash(i):
+    return sha256(str(i).encode()).hexdigest()
+
+
+def _measure(create, count):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = [create(i) for i in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # the list holding the objects is not part of their footprint
+    list_size = sys.getsizeof(objects)
+    return (after - before - list_size) / float(count)
+
+
+class DictLayout:
+    """Keeps its attributes in an instance dictionary, as the classes did
+    before they declared __slots__"""
+
+    def __init__(self, attributes):
+        for name, value in attributes:
+            setattr(self, name, value)
+
+
+def create_transaction(i):
+    transaction = Transaction(SENDER, RECEIVER, PAYLOAD, SIGNATURE)
+    transaction.transaction_hash = _hex_hash(i)
+    return transaction
+
+
+def create_block(i):
+    block = LogicalBlock(block_id=i, transactions=[],
+                         predecessor_hash=_hex_hash(i),
+                         merkle_tree_root=_hex_hash(-i),
+                         block_creator_id='creator', timestamp=0)
+    block.set_block_pos(i)
+    block.get_computed_hash()
+    return block
+
+
+def create_dict_transaction(i):
+    return DictLayout((('_Transaction__sender', SENDER),
+                       ('_Transaction__receiver', RECEIVER),
+                       ('_Transaction__payload', PAYLOAD),
+                       ('_Transaction__signature', SIGNATURE),
+                       ('_Transaction__transaction_hash', _hex_hash(i))))
+
+
+def create_dict_block(i):
+    return DictLayout((('_block_id', i), ('_timestamp', 0), ('_transactions', []),
+                       ('_merkle_tree_root', _hex_hash(-i)),
+                       ('_predecessor_hash', _hex_hash(i)),
+                       ('_nonce', 0), ('_block_creator_id', 'creator'),
+                       ('_difficulty', -1), ('_logger', logging.getLogger(__name__)),
+                       ('_position_in_chain', i), ('_computed_hash', _hex_hash(i + 0.5)),
+                       ('_chain_work', 0), ('_body_dropped', False),
+                       ('_merkle_tree', None), ('_merkle_accumulator', None),
+                       ('_skip_hash', None), ('_difficulty_window', None),
+                       ('_crypto_helper', CryptoHelper.instance()),
+                       ('_consensus', None)))
+
+
+class _UnsignedCryptoHelper:
+    """Hashes like the CryptoHelper but accepts every signature"""
+
+    @staticmethod
+    def hash(message):
+        return sha256(message.encode()).hexdigest()
+
+    @staticmethod
+    def validate(public_key, message, signature):
+        return True
+
+
+def _time_pool_round_trip(count, packed):
+    """Adds transactions to the pool and takes them out again, returns the
+    time per transaction in microseconds. Upper case hex hashes are not
+    packed, so the same code runs on hex strings"""
+    pool = TxPool(_UnsignedCryptoHelper())
+    transactions = []
+    for i in range(count):
+        transaction = Transaction(SENDER, RECEIVER, 'payload {}'.format(i), SIGNATURE)
+        transaction.transaction_hash = _hex_hash(i) if packed else _hex_hash(i).upper()
+        transactions.append(transaction)
+    start = time.perf_counter()
+    pool.add_transactions(transactions)
+    for _ in range(0, count, 1000):
+        pool.get_transactions_round_robin(1000)
+    return (time.perf_counter() - start) * 1e6 / count
+
+
+def _time_per_call(statement, number=200000):
+    return min(timeit.repeat(statement, number=number, repeat=5)) / number * 1e9
+
+
+def _print_access_times():
+    transaction = create_transaction(1)
+    dict_transaction = create_dict_transaction(1)
+    block = create_block(1)
+    dict_block = create_dict_block(1)
+    index = {transaction.transaction_hash: 0}
+    dict_index = {dict_transaction._Transaction__transaction_hash: 0}
+    accesses = [
+        ('transaction hash',
+         lambda: transaction.transaction_hash,
+         lambda: dict_transaction._Transaction__transaction_hash),
+        ('index lookup by transaction hash',
+         lambda: index[transaction.transaction_hash],
+         lambda: dict_index[dict_transaction._Transaction__transaction_hash]),
+        ('block hash',
+         block.get_computed_hash,
+         lambda: dict_block._computed_hash),
+        ('block to_dict', block.to_dict, None),
+    ]
+    print('Access times in ns, packed (hex strings):')
+    for name, packed, unpacked in accesses:
+        if unpacked is None:
+            print('  {}: {:.0f}'.format(name, _time_per_call(packed)))
+        else:
+            print('  {}: {:.0f} ({:.0f})'.format(
+                name, _time_per_call(packed), _time_per_call(unpacked)))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    print('Bytes per object, __slots__ and packed hashes (instance dictionary '
+          'and hex strings):')
+    print('  Transaction: {:.0f} ({:.0f})'.format(
+        _measure(create_transaction, count),
+        _measure(create_dict_transaction, count)))
+    print('  LogicalBlock: {:.0f} ({:.0f})'.format(
+        _measure(create_block, count), _measure(create_dict_block, count)))
+    _print_access_times()
+    # alternate the layouts and take the best run, the pool is warm then
+    runs = [(_time_pool_round_trip(count, True), _time_pool_round_trip(count, False))
+            for _ in range(3)]
+    print('Pool round trip in us per transaction, packed (hex strings): '
+          '{:.2f} ({:.2f})'.format(min(run[0] for run in runs),
+                                   min(run[1] for run in runs)))
+
+
+if __name__ == '__main__':
+    main()
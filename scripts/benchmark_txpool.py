@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+"""Measures the operations of the transaction pool with many pending
+transactions.
+
+Fills the pool, then times duplicate admissions, lookups by hash,
+removals and the extraction of block sized batches. Signatures are not
+verified, only the cost of the pool itself is measured.
+
+Usage: python scripts/benchmark_txpool.py [number of transactions]
+"""
+from hashlib import sha256
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from labchain.datastructure.transaction import Transaction  # noqa: E402
+from labchain.datastructure.txpool import TxPool  # noqa: E402
+
+SENDER = 'S' * 240
+RECEIVER = 'R' * 240
+SIGNATURE = 'G' * 88
+BATCH_SIZE = 1000
+SENDERS = 100
+
+
+class _UnsignedCryptoHelper:
+    """Hashes like the CryptoHelper but accepts every signature"""
+
+    @staticmethod
+    def hash(message):
+        return sha256(message.encode()).hexdigest()
+
+    @staticmethod
+    def validate(public_key, message, signature):
+        return True
+
+
+def _timed(label, count, operation):
+    start = time.perf_counter()
+    result = operation()
+    elapsed = time.perf_counter() - start
+    print('{:<24} {:>9.3f} s {:>9.2f} us per transaction'.format(
+        label, elapsed, elapsed * 1e6 / max(count, 1)))
+    return result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    pool = TxPool(_UnsignedCryptoHelper())
+    transactions = [Transaction(SENDER, RECEIVER, 'payload {}'.format(i), SIGNATURE)
+                    for i in range(count)]
+    sample = transactions[::max(count // 10000, 1)]
+
+    _timed('add', count, lambda: [pool.add_transaction_if_not_exist(t)
+                                  for t in transactions])
+    _timed('add duplicate', len(sample), lambda: [pool.add_transaction_if_not_exist(t)
+                                                  for t in sample])
+    _timed('get by hash', len(sample), lambda: [pool.get_transaction_by_hash(t.transaction_hash)
+                                                for t in sample])
+    _timed('remove', len(sample), lambda: [pool.remove_transaction(t) for t in sample])
+    remaining = pool.get_transaction_count()
+    _timed('get batches of {}'.format(BATCH_SIZE), remaining,
+           lambda: [pool.get_transactions(BATCH_SIZE)
+                    for _ in range(-(-remaining // BATCH_SIZE))])
+
+    # refill the pool with transactions of SENDERS senders
+    transactions = [Transaction('{} {}'.format(SENDER, i % SENDERS), RECEIVER,
+                                'payload {}'.format(i), SIGNATURE)
+                    for i in range(count)]
+    for transaction in transactions:
+        pool.add_transaction_if_not_exist(transaction)
+    _timed('round robin batches', count,
+           lambda: [pool.get_transactions_round_robin(BATCH_SIZE)
+                    for _ in range(-(-count // BATCH_SIZE))])
+
+
+if __name__ == '__main__':
+    main()
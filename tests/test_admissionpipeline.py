@@ -0,0 +1,56 @@
+import threading
+import unittest
+
+from labchain.util.admissionPipeline import AdmissionPipeline
+
+
+class AdmissionPipelineTestCase(unittest.TestCase):
+    """Class of testcases for the AdmissionPipeline module"""
+
+    def setUp(self):
+        self.admitted_batches = []
+        self.broadcasts = []
+        self.lock = threading.Lock()
+
+    def admit(self, transactions):
+        with self.lock:
+            self.admitted_batches.append(list(transactions))
+        # odd transactions are rejected
+        return [t for t in transactions if t % 2 == 0]
+
+    def broadcast(self, transactions):
+        with self.lock:
+            self.broadcasts.append(transactions)
+
+    def test_process_batch(self):
+        pipeline = AdmissionPipeline(self.admit, self.broadcast)
+        self.assertEqual(pipeline.process_batch([1, 2, 4]), [2, 4])
+        self.assertEqual(pipeline.process_batch([3]), [])
+        self.assertEqual(self.broadcasts, [[2, 4]])
+
+    def test_failing_broadcast(self):
+        def broadcast(transactions):
+            raise ValueError('invalid response')
+
+        pipeline = AdmissionPipeline(self.admit, broadcast)
+        self.assertEqual(pipeline.process_batch([2]), [2])
+
+    def test_batches(self):
+        pipeline = AdmissionPipeline(self.admit, self.broadcast, batch_size=4,
+                                     max_delay=10, max_queue_size=20)
+        for transaction in range(10):
+            self.assertTrue(pipeline.submit(transaction))
+        pipeline.start()
+        pipeline.stop()
+        self.assertEqual(self.admitted_batches, [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]])
+        self.assertEqual(self.broadcasts, [[0, 2], [4, 6], [8]])
+        self.assertEqual(pipeline.get_queue_size(), 0)
+
+    def test_full_queue(self):
+        pipeline = AdmissionPipeline(self.admit, self.broadcast, max_queue_size=1)
+        self.assertTrue(pipeline.submit(0))
+        self.assertFalse(pipeline.submit(1))
+
+
+if __name__ == '__main__':
+    unittest.main()
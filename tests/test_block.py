@@ -0,0 +1,50 @@
+import unittest
+
+from labchain.datastructure.block import LogicalBlock
+from labchain.datastructure.transaction import Transaction
+
+
+class LogicalBlockTestCase(unittest.TestCase):
+    """Class of testcases for the LogicalBlock module"""
+
+    def setUp(self):
+        self.block = LogicalBlock(block_id=1, transactions=[],
+                                  predecessor_hash='prev_hash',
+                                  block_creator_id='creator')
+
+    def test_computed_hash_is_cached(self):
+        """Test that repeated hash computations hit the cache"""
+        stats_before = LogicalBlock.get_hash_cache_stats()
+        block_hash = self.block.get_computed_hash()
+        self.assertEqual(block_hash, self.block.get_computed_hash())
+        stats_after = LogicalBlock.get_hash_cache_stats()
+        self.assertEqual(stats_after['misses'], stats_before['misses'] + 1)
+        self.assertEqual(stats_after['hits'], stats_before['hits'] + 1)
+
+    def test_computed_hash_invalidated_by_header_change(self):
+        """Test that changing nonce or difficulty changes the hash"""
+        block_hash = self.block.get_computed_hash()
+        self.block.nonce = 42
+        nonce_hash = self.block.get_computed_hash()
+        self.assertNotEqual(block_hash, nonce_hash)
+        self.block.difficulty = 3
+        self.assertNotEqual(nonce_hash, self.block.get_computed_hash())
+
+    def test_append_transactions(self):
+        """Test that appending transactions updates root and hash"""
+        transactions = [Transaction('sender', 'receiver', 'payload' + str(i), 'signature')
+                        for i in range(5)]
+        block_hash = self.block.get_computed_hash()
+        self.block.append_transactions(transactions[:2])
+        self.block.append_transactions(transactions[2:])
+        full_block = LogicalBlock(block_id=1, transactions=transactions,
+                                  predecessor_hash='prev_hash',
+                                  block_creator_id='creator')
+        self.assertEqual(self.block.transactions, transactions)
+        self.assertEqual(self.block.merkle_tree_root, full_block.merkle_tree_root)
+        self.assertEqual(self.block.compute_merkle_root(), full_block.merkle_tree_root)
+        self.assertNotEqual(self.block.get_computed_hash(), block_hash)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,13 +1,18 @@
 #!/usr/bin/env python
 import json
+import pickle
+import threading
 import unittest
 from unittest.mock import Mock
 
+from labchain.datastructure.block import LogicalBlock
 from labchain.datastructure.blockchain import BlockChain
+from labchain.datastructure.merkle import MerkleTree
 from labchain.util.configReader import ConfigReader
 from labchain.consensus.consensus import Consensus
 from labchain.util.cryptoHelper import CryptoHelper as crypto
 from labchain.datastructure.transaction import Transaction
+from labchain.util.ringBuffer import RingBuffer
 from labchain.datastructure.txpool import TxPool
 
 
@@ -25,6 +30,26 @@ class BlockChainComponent(unittest.TestCase):
         blocks = self.blockchain.get_block_range(0)
         self.assertEqual(len(blocks), 0)
 
+    def test_get_block_range_and_ancestors(self):
+        self.consensus.validate = Mock(return_value=True)
+        hashes = [self.blockchain._first_block_hash]
+        for block_id in range(1, 41):
+            hashes.append(self.add_block_on(hashes[-1], block_id))
+        fork_hash = self.add_block_on(hashes[35], 36, nonce=1)
+        fork_hash = self.add_block_on(fork_hash, 37, nonce=1)
+
+        for position in range(0, 41):
+            self.assertEqual(self.blockchain._get_ancestor(hashes[40], position), hashes[position])
+        self.assertEqual(self.blockchain._find_common_ancestor(hashes[40], fork_hash), hashes[35])
+
+        blocks = self.blockchain.get_block_range(hashes[10], hashes[20])
+        self.assertEqual([b.get_computed_hash() for b in blocks], hashes[20:9:-1])
+        self.assertEqual(len(self.blockchain.get_block_range()), 40)
+        blocks = self.blockchain.get_block_range(hashes[30], fork_hash)
+        self.assertEqual(blocks[-1].get_computed_hash(), hashes[30])
+        self.assertEqual(len(blocks), 8)
+        self.assertIsNone(self.blockchain.get_block_range(hashes[38], fork_hash))
+
     def test_get_block_by_id(self):
         self.create_blocks()
         # fetching first block whose id = 0
@@ -32,11 +57,46 @@ class BlockChainComponent(unittest.TestCase):
         for block in blocks:
             self.assertEqual(block._block_id, 0)
 
+    def test_get_block_by_id_index(self):
+        self.consensus.validate = Mock(return_value=True)
+        genesis = self.blockchain._first_block_hash
+        hash_a = self.add_block_on(genesis, 1, nonce=1)
+        hash_b = self.add_block_on(genesis, 1, nonce=2)
+        blocks = self.blockchain.get_block_by_id(1)
+        self.assertEqual({b.get_computed_hash() for b in blocks}, {hash_a, hash_b})
+        self.assertEqual(self.blockchain.get_block_by_id(2), [])
+
+        # outgrow the tolerance level on branch a, branch b gets pruned
+        _hash = hash_a
+        for block_id in range(2, self.blockchain._tolerance_level + 3):
+            _hash = self.add_block_on(_hash, block_id)
+        blocks = self.blockchain.get_block_by_id(1)
+        self.assertEqual([b.get_computed_hash() for b in blocks], [hash_a])
+
     def test_get_block_by_hash(self):
         self.create_blocks()
         block_info = json.loads(self.blockchain.get_block_by_hash(self.blockchain._first_block_hash))
         self.assertEqual(block_info['nr'], 0)
 
+    def test_get_block_by_hash_cached(self):
+        block_json = self.blockchain.get_block_by_hash(self.blockchain._first_block_hash)
+        self.assertIs(self.blockchain.get_block_by_hash(self.blockchain._first_block_hash), block_json)
+        self.assertIsNone(self.blockchain.get_block_by_hash('unknown'))
+
+    def test_get_block_by_hash_pruned_meanwhile(self):
+        self.consensus.validate = Mock(return_value=True)
+        block_hash = self.add_block_on(self.blockchain._first_block_hash, 1)
+        get_full_block = self.blockchain._get_full_block
+
+        def prune_after_lookup(_hash):
+            block = get_full_block(_hash)
+            self.blockchain._remove_from_chain(_hash)
+            return block
+
+        self.blockchain._get_full_block = prune_after_lookup
+        self.assertIsNotNone(self.blockchain.get_block_by_hash(block_hash))
+        self.assertNotIn(block_hash, self.blockchain._block_json_cache)
+
     def test_add_block(self):
         self.create_blocks()
         self.blockchain.add_block(self.block1)
@@ -74,6 +134,62 @@ class BlockChainComponent(unittest.TestCase):
         # after branch switching the length of the block should be same
         self.assertEqual(prev_block_length, after_block_length, "Block is deleted")
 
+    def test_switch_to_longer_branch_of_other_node(self):
+        self.consensus.validate = Mock(return_value=True)
+        genesis = self.blockchain._first_block_hash
+        hash_a = self.add_block_on(genesis, 1, nonce=1)
+        hash_a = self.add_block_on(hash_a, 2, nonce=1)
+        hash_b = self.add_block_on(genesis, 1, nonce=2)
+        self.assertEqual(self.blockchain._node_branch_head, hash_a)
+        self.assertEqual(self.blockchain._find_common_ancestor(hash_a, hash_b), genesis)
+
+        for block_id in range(2, self.blockchain._tolerance_level + 3):
+            hash_b = self.add_block_on(hash_b, block_id, nonce=2)
+        self.assertEqual(self.blockchain._node_branch_head, hash_b)
+        self.assertEqual(self.blockchain._current_branch_heads, {hash_b})
+        self.assertEqual(self.blockchain._main_chain[-1], hash_b)
+        self.assertEqual(len(self.blockchain._main_chain), self.blockchain._tolerance_level + 3)
+        self.assertNotIn(hash_a, self.blockchain._blockchain)
+        self.assertEqual(len(self.blockchain._blockchain), self.blockchain._tolerance_level + 3)
+
+    def test_switch_prunes_sibling_forks(self):
+        self.consensus.validate = Mock(return_value=True)
+        genesis = self.blockchain._first_block_hash
+        fork_root = self.add_block_on(genesis, 1, nonce=1)
+        sibling_a = self.add_block_on(fork_root, 2, nonce=1)
+        sibling_b = self.add_block_on(fork_root, 2, nonce=2)
+        hash_c = self.add_block_on(genesis, 1, nonce=2)
+
+        for block_id in range(2, self.blockchain._tolerance_level + 4):
+            hash_c = self.add_block_on(hash_c, block_id, nonce=2)
+        self.assertEqual(self.blockchain._node_branch_head, hash_c)
+        self.assertEqual(self.blockchain._current_branch_heads, {hash_c})
+        self.assertEqual(self.blockchain._main_chain[-1], hash_c)
+        for pruned_hash in (fork_root, sibling_a, sibling_b):
+            self.assertNotIn(pruned_hash, self.blockchain._blockchain)
+        self.assertEqual(len(self.blockchain._blockchain), self.blockchain._tolerance_level + 4)
+        self.assertEqual(self.blockchain.get_block_by_id(2),
+                         [self.blockchain._blockchain[self.blockchain._main_chain[2]]])
+
+    def test_adopt_orphans(self):
+        # blocks without predecessor fail the proof of work check
+        self.consensus.validate = Mock(side_effect=lambda block, latest, *args: latest != -1)
+        genesis = self.blockchain._first_block_hash
+        parent = LogicalBlock(block_id=1, transactions=[], predecessor_hash=genesis,
+                              block_creator_id="nodeId2", consensus_obj=self.consensus)
+        parent_hash = parent.get_computed_hash()
+        self.blockchain._q = Mock()
+        orphan_hashes = [self.add_block_on(parent_hash, 2, nonce=nonce) for nonce in range(2)]
+        self.assertEqual(len(self.blockchain._orphan_blocks), 2)
+        self.blockchain._q.put.assert_called_with(parent_hash)
+
+        self.assertTrue(self.blockchain.add_block(parent, False))
+        self.assertEqual(len(self.blockchain._orphan_blocks), 0)
+        for orphan_hash in orphan_hashes:
+            self.assertIn(orphan_hash, self.blockchain._blockchain)
+            self.assertEqual(self.blockchain._blockchain[orphan_hash].get_block_pos(), 2)
+        self.assertEqual(self.blockchain._current_branch_heads, set(orphan_hashes))
+
     def test_calculate_diff(self):
         self.create_blocks()
         # blocks added in setup
@@ -83,6 +199,21 @@ class BlockChainComponent(unittest.TestCase):
         self.assertIsNotNone(t2)
         self.assertIsNotNone(diff)
 
+    def test_calculate_diff_window(self):
+        self.consensus.validate = Mock(return_value=True)
+        _hash = self.blockchain._first_block_hash
+        num_of_blocks = self.blockchain._min_blocks + 5
+        for block_id in range(1, num_of_blocks + 1):
+            _hash = self.add_block_on(_hash, block_id, timestamp=1000 + 10 * block_id,
+                                      difficulty=block_id % 4 + 1)
+        window = range(num_of_blocks - self.blockchain._min_blocks + 1, num_of_blocks + 1)
+        latest_ts, earliest_ts, blocks, diff = self.blockchain.calculate_diff()
+        self.assertEqual(latest_ts, 1000 + 10 * num_of_blocks)
+        self.assertEqual(earliest_ts, 1000 + 10 * window[0])
+        self.assertEqual(blocks, self.blockchain._min_blocks)
+        self.assertEqual(diff, float(sum(i % 4 + 1 for i in window)) / len(window))
+        self.assertEqual(self.blockchain.calculate_diff('unknown'), (-1, -1, -1, -1))
+
     def test_create_block(self):
         self.create_blocks()
         # creating new block based on given transaction list
@@ -94,11 +225,269 @@ class BlockChainComponent(unittest.TestCase):
         self.assertEqual(self.blockchain.get_n_last_transactions(0), [])
         self.assertEqual(self.blockchain.get_n_last_transactions(1), [self.txn1])
         self.assertEqual(self.blockchain.get_n_last_transactions(3), [self.txn1,self.txn2])
+
+    def test_get_last_n_transactions_after_reorganization(self):
+        self.consensus.validate = Mock(return_value=True)
+        genesis = self.blockchain._first_block_hash
+        _hash = self.add_block_on(genesis, 1, transactions=[self.txn1, self.txn2])
+        _hash = self.add_block_on(_hash, 2, transactions=[self.txn3])
+        self.assertEqual(self.blockchain.get_n_last_transactions(3),
+                         [self.txn3, self.txn1, self.txn2])
+
+        _hash = self.add_block_on(genesis, 1, nonce=1, transactions=[self.txn4])
+        for block_id in range(2, self.blockchain._tolerance_level + 4):
+            _hash = self.add_block_on(_hash, block_id, nonce=1)
+        self.assertEqual(self.blockchain._snapshot.head_hash, _hash)
+        self.assertEqual(self.blockchain.get_n_last_transactions(3), [self.txn4])
+        # requests larger than the buffer walk the chain
+        self.blockchain._recent_transactions = RingBuffer(0)
+        self.assertEqual(self.blockchain.get_n_last_transactions(3), [self.txn4])
+
+    def test_recent_transactions_kept_when_head_unchanged(self):
+        self.consensus.validate = Mock(return_value=True)
+        genesis = self.blockchain._first_block_hash
+        _hash = self.add_block_on(genesis, 1, nonce=1, transactions=[self.txn4])
+        self.add_block_on(genesis, 1, transactions=[self.txn1])
+        self.assertEqual(self.blockchain._snapshot.head_hash, _hash)
+        recent_transactions = self.blockchain._recent_transactions
+        # the followed branch outgrows the fork, which is pruned
+        for block_id in range(2, self.blockchain._tolerance_level + 3):
+            _hash = self.add_block_on(_hash, block_id, transactions=[self.txn2])
+        self.assertEqual(self.blockchain._current_branch_heads, {_hash})
+        self.assertIs(self.blockchain._recent_transactions, recent_transactions)
+        self.assertEqual(self.blockchain.get_n_last_transactions(2), [self.txn2, self.txn2])
     
+    def test_get_transactions_page(self):
+        self.consensus.validate = Mock(return_value=True)
+        genesis = self.blockchain._first_block_hash
+        _hash = self.add_block_on(genesis, 1, transactions=[self.txn1, self.txn2])
+        _hash = self.add_block_on(_hash, 2)
+        _hash = self.add_block_on(_hash, 3, transactions=[self.txn3])
+        transactions, cursor = self.blockchain.get_transactions_page(limit=1)
+        self.assertEqual((transactions, cursor), ([self.txn1], [1, 1]))
+        transactions, cursor = self.blockchain.get_transactions_page(cursor, limit=2)
+        self.assertEqual((transactions, cursor), ([self.txn2, self.txn3], None))
+        self.assertEqual([t for _, t in self.blockchain.iter_transactions([3, 0])], [self.txn3])
+        self.assertEqual(list(self.blockchain.iter_transactions([4, 0])), [])
+
+    def test_dump_and_load_state(self):
+        self.consensus.validate = Mock(return_value=True)
+        genesis = self.blockchain._first_block_hash
+        _hash = self.add_block_on(genesis, 1, transactions=[self.txn1, self.txn2])
+        _fork_hash = self.add_block_on(genesis, 1, nonce=1, transactions=[self.txn3])
+        _hash = self.add_block_on(_hash, 2, transactions=[self.txn4])
+        data = self.blockchain.dump_state()
+
+        restored = BlockChain(node_id="nodeId1", tolerance_value=self.blockchain._tolerance_level,
+                              pruning_interval=1, consensus_obj=self.consensus,
+                              txpool_obj=self.txpool, crypto_helper_obj=self.crypto_helper_obj,
+                              min_blocks_for_difficulty=self.blockchain._min_blocks, db=None, q=None)
+        self.assertFalse(restored.load_state(b'not a state'))
+        # only the chain classes are unpickled
+        state = pickle.loads(data)
+        state['blockchain'] = Mock
+        self.assertFalse(restored.load_state(pickle.dumps(state)))
+        # a state whose head is not in the DB is discarded
+        restored._db = Mock()
+        restored._db.get_block_by_hash.return_value = None
+        self.assertFalse(restored.load_state(data))
+        restored._db.get_block_by_hash.assert_called_with(_hash)
+        restored._db = None
+        self.assertTrue(restored.load_state(data))
+        self.assertEqual(restored._snapshot.head_hash, _hash)
+        self.assertEqual(restored._main_chain, self.blockchain._main_chain)
+        self.assertEqual(restored._current_branch_heads, {_hash, _fork_hash})
+        self.assertIs(restored._blockchain[_hash]._consensus, self.consensus)
+        self.assertEqual(restored.get_transaction(self.txn3.transaction_hash)[0], self.txn3)
+        self.assertEqual(restored.get_n_last_transactions(2), [self.txn4, self.txn1])
+        self.assertEqual(restored.calculate_diff(_hash), self.blockchain.calculate_diff(_hash))
+        # the restored chain keeps growing
+        block = LogicalBlock(block_id=3, predecessor_hash=_hash, block_creator_id="nodeId2",
+                             timestamp=0, consensus_obj=self.consensus)
+        self.assertTrue(restored.add_block(block, False))
+        self.assertEqual(restored._snapshot.height, 3)
+
     def test_get_transactions_by_hash(self):
         block_hash = self.create_and_save_block([self.txn1, self.txn2])
         self.assertEqual(self.blockchain.get_transaction(self.txn1.transaction_hash),(self.txn1,block_hash))
 
+    def test_get_transaction_index_after_pruning(self):
+        self.consensus.validate = Mock(return_value=True)
+        genesis = self.blockchain._first_block_hash
+        hash_a = self.add_block_on(genesis, 1, nonce=1, transactions=[self.txn1])
+        hash_b = self.add_block_on(genesis, 1, nonce=2, transactions=[self.txn2])
+        self.assertEqual(self.blockchain.get_transaction(self.txn1.transaction_hash), (self.txn1, hash_a))
+        self.assertEqual(self.blockchain.get_transaction(self.txn2.transaction_hash), (self.txn2, hash_b))
+
+        _hash = hash_a
+        for block_id in range(2, self.blockchain._tolerance_level + 3):
+            _hash = self.add_block_on(_hash, block_id)
+        self.assertEqual(self.blockchain.get_transaction(self.txn2.transaction_hash), (None, None))
+        self.assertEqual(self.blockchain.get_transaction(self.txn1.transaction_hash), (self.txn1, hash_a))
+
+    def test_get_merkle_proof(self):
+        self.consensus.validate = Mock(return_value=True)
+        txns = [self.txn1, self.txn2, self.txn3]
+        block_hash = self.add_block_on(self.blockchain._first_block_hash, 1, transactions=txns)
+        block = self.blockchain._blockchain[block_hash]
+        for txn in txns:
+            proof = self.blockchain.get_merkle_proof(txn.transaction_hash)
+            self.assertEqual(proof['blockHash'], block_hash)
+            self.assertEqual(proof['merkleHash'], block.merkle_tree_root)
+            self.assertTrue(MerkleTree.verify_proof(txn.transaction_hash, proof['proof'],
+                                                    block.merkle_tree_root))
+        self.assertIsNone(self.blockchain.get_merkle_proof(self.txn4.transaction_hash))
+
+    def test_get_transactions_by_address(self):
+        self.consensus.validate = Mock(return_value=True)
+        genesis = self.blockchain._first_block_hash
+        _hash = self.add_block_on(genesis, 1, transactions=[self.txn1, self.txn3])
+        self.add_block_on(_hash, 2, transactions=[self.txn4])
+        receiver = self.txn1.receiver
+        sender = self.txn1.sender
+        self.assertEqual(self.blockchain.get_transactions_by_sender(sender), [self.txn1])
+        self.assertEqual(self.blockchain.get_transactions_by_receiver(sender), [self.txn3])
+        self.assertEqual(self.blockchain.get_transactions_by_receiver(receiver), [self.txn1])
+        self.assertEqual(self.blockchain.get_transactions_by_receiver(self.txn4.receiver, 0, 1), [self.txn4])
+        self.assertEqual(self.blockchain.get_transactions_by_receiver(self.txn4.receiver, 1, 1), [])
+        self.assertEqual(self.blockchain.get_transactions_by_sender("unknown"), [])
+
+    def test_finality_drops_old_bodies(self):
+        self.consensus.validate = Mock(return_value=True)
+        saved_blocks = {}
+        db = Mock()
+        db.save_block = Mock(side_effect=lambda b: saved_blocks.setdefault(
+            b.get_computed_hash(), LogicalBlock.from_block(b, None)) is not None)
+        db.get_block_by_hash = Mock(side_effect=saved_blocks.get)
+        self.blockchain._db = db
+        self.blockchain._finality_depth = self.blockchain._tolerance_level + 1
+
+        hashes = [self.blockchain._first_block_hash]
+        for block_id in range(1, 12):
+            block = LogicalBlock(block_id=block_id,
+                                 transactions=[self.txn1] if block_id == 1 else [],
+                                 predecessor_hash=hashes[-1],
+                                 block_creator_id="nodeId2",
+                                 consensus_obj=self.consensus)
+            self.assertTrue(self.blockchain.add_block(block))
+            hashes.append(block.get_computed_hash())
+
+        self.assertEqual(self.blockchain._finalized_position, 4)
+        self.assertFalse(self.blockchain._blockchain[hashes[1]].has_body())
+        self.assertTrue(self.blockchain._blockchain[hashes[5]].has_body())
+        self.assertEqual(self.blockchain.get_transaction(self.txn1.transaction_hash),
+                         (self.txn1, hashes[1]))
+        block_info = json.loads(self.blockchain.get_block_by_hash(hashes[1]))
+        self.assertEqual(len(block_info['transactions']), 1)
+
+        # blocks whose body is missing in the DB are skipped by readers
+        del saved_blocks[hashes[1]]
+        self.blockchain._block_json_cache.clear()
+        self.assertIsNone(self.blockchain.get_block_by_hash(hashes[1]))
+        self.assertEqual(self.blockchain.get_transaction(self.txn1.transaction_hash),
+                         (None, None))
+        self.assertIsNone(self.blockchain.get_merkle_proof(self.txn1.transaction_hash))
+        self.assertEqual(self.blockchain.get_transactions_by_sender(self.txn1.sender), [])
+        self.assertEqual(list(self.blockchain.iter_transactions()), [])
+        self.assertIsNone(self.blockchain.get_block_range(hashes[1], hashes[2]))
+
+        # forks before the checkpoint are rejected
+        fork = LogicalBlock(block_id=4, transactions=[], predecessor_hash=hashes[3],
+                            block_creator_id="nodeId2", nonce=1,
+                            consensus_obj=self.consensus)
+        self.assertFalse(self.blockchain.add_block(fork))
+
+    def test_add_blocks(self):
+        self.consensus.validate = Mock(side_effect=lambda block, latest, *args: latest != -1)
+        db = Mock()
+        db.save_blocks = Mock(return_value=True)
+        self.blockchain._db = db
+        self.blockchain.request_block_from_neighbour = Mock()
+        self.blockchain._finality_depth = self.blockchain._tolerance_level + 1
+
+        blocks = []
+        predecessor_hash = self.blockchain._first_block_hash
+        for block_id in range(1, 16):
+            block = LogicalBlock(block_id=block_id,
+                                 transactions=[self.txn1] if block_id == 1 else [],
+                                 predecessor_hash=predecessor_hash,
+                                 block_creator_id="nodeId2",
+                                 consensus_obj=self.consensus)
+            predecessor_hash = block.get_computed_hash()
+            blocks.append(block)
+        # the swapped blocks are adopted from the orphan pool
+        blocks[3], blocks[4] = blocks[4], blocks[3]
+
+        self.assertEqual(self.blockchain.add_blocks(blocks), 15)
+        self.assertEqual(self.blockchain.add_blocks(blocks), 0)
+        db.save_blocks.assert_called_once()
+        self.assertEqual(len(db.save_blocks.call_args[0][0]), 15)
+        self.assertEqual(self.blockchain._snapshot.head_hash, predecessor_hash)
+        self.assertEqual(self.blockchain._finalized_position, 8)
+        self.assertEqual(self.blockchain._unsaved_blocks, set())
+        self.assertFalse(self.blockchain._blockchain[blocks[0].get_computed_hash()].has_body())
+        self.assertTrue(self.blockchain._blockchain[predecessor_hash].has_body())
+
+    def test_add_blocks_save_conflict(self):
+        self.consensus.validate = Mock(return_value=True)
+        blocks = []
+        predecessor_hash = self.blockchain._first_block_hash
+        for block_id in range(1, 4):
+            block = LogicalBlock(block_id=block_id, transactions=[],
+                                 predecessor_hash=predecessor_hash,
+                                 block_creator_id="nodeId2",
+                                 consensus_obj=self.consensus)
+            predecessor_hash = block.get_computed_hash()
+            blocks.append(block)
+        conflicting_hash = blocks[1].get_computed_hash()
+        db = Mock()
+        db.save_blocks = Mock(return_value=False)
+        db.save_block = Mock(side_effect=lambda b: b.get_computed_hash() != conflicting_hash)
+        self.blockchain._db = db
+
+        # the batch is saved block by block, only the conflicting one stays unsaved
+        self.assertEqual(self.blockchain.add_blocks(blocks), 3)
+        self.assertEqual(db.save_block.call_count, 3)
+        self.assertEqual(self.blockchain._unsaved_blocks, {conflicting_hash})
+
+    def test_concurrent_reads_during_reorganization(self):
+        self.consensus.validate = Mock(return_value=True)
+        genesis = self.blockchain._first_block_hash
+        errors = []
+        done = threading.Event()
+
+        def read():
+            try:
+                while not done.is_set():
+                    snapshot = self.blockchain._snapshot
+                    blocks = self.blockchain.get_block_range()
+                    self.assertIsNotNone(blocks)
+                    self.assertGreaterEqual(len(blocks), snapshot.height)
+                    self.blockchain.get_n_last_transactions(5)
+                    self.blockchain.get_block_by_id(3)
+            except Exception as e:
+                errors.append(e)
+
+        readers = [threading.Thread(target=read) for _ in range(4)]
+        for reader in readers:
+            reader.start()
+        try:
+            hashes = [genesis]
+            for block_id in range(1, 6):
+                hashes.append(self.add_block_on(hashes[-1], block_id))
+            for nonce in range(1, 4):
+                # fork off two blocks below the head and outgrow the tolerance
+                hashes = hashes[:-2]
+                for _ in range(self.blockchain._tolerance_level + 2):
+                    hashes.append(self.add_block_on(hashes[-1], len(hashes), nonce=nonce))
+            _hash = hashes[-1]
+        finally:
+            done.set()
+            for reader in readers:
+                reader.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(self.blockchain._snapshot.head_hash, _hash)
+
     """
     def test_send_block_to_neighbour(self):
         block_as_json = self.blockchain.send_block_to_neighbour(self.block1)
@@ -167,6 +556,19 @@ class BlockChainComponent(unittest.TestCase):
         self.block6 = self.blockchain.create_block([self.txn3, self.txn4])
         self.block7 = self.blockchain.create_block([self.txn2, self.txn4])
 
+    def add_block_on(self, predecessor_hash, block_id, nonce=0, transactions=None,
+                     timestamp=0, difficulty=-1):
+        block = LogicalBlock(block_id=block_id,
+                             transactions=transactions or [],
+                             predecessor_hash=predecessor_hash,
+                             block_creator_id="nodeId2",
+                             nonce=nonce,
+                             timestamp=timestamp,
+                             difficulty=difficulty,
+                             consensus_obj=self.consensus)
+        self.assertTrue(self.blockchain.add_block(block, False))
+        return block.get_computed_hash()
+
     def create_and_save_block(self,transactions):
         block_hash = None
         block = self.blockchain.create_block(transactions)
@@ -19,6 +19,7 @@ class BootstrapperTestCase(TestCase):
         self.bootstrapper = Bootstrapper(network_interface)
         self.blockchain = blockchain
         self.blockchain.add_block = MagicMock(return_value=True)
+        self.blockchain.add_blocks = MagicMock(return_value=2)
         self.blockchain.create_block = MagicMock(return_value=genesis_block)
         self.block1 = block1
         self.block2 = block2
@@ -36,8 +37,8 @@ class BootstrapperTestCase(TestCase):
         # when
         self.bootstrapper.do_bootstrap(self.blockchain)
         # then
-        self.assertEqual(2, self.blockchain.add_block.call_count)
-        self.blockchain.add_block.assert_has_calls([call(self.block2), call(self.block1)], any_order=False)
+        self.assertEqual(1, self.blockchain.add_blocks.call_count)
+        self.blockchain.add_blocks.assert_has_calls([call([self.block2, self.block1])])
 
     def test_bootstrap_with_no_blocks(self):
         # given
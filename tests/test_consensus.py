@@ -1,6 +1,7 @@
 from unittest.mock import MagicMock
 from labchain.datastructure.block import Block
 from labchain.consensus.consensus import Consensus
+from labchain.util.cryptoHelper import CryptoHelper
 from datetime import datetime
 from unittest import TestCase
 
@@ -9,6 +10,10 @@ class Tests(TestCase):
     def __init__(self, *args):
         super().__init__(*args)
 
+    def tearDown(self):
+        # the tests mock the hash of the shared CryptoHelper instance
+        vars(CryptoHelper.instance()).pop('hash', None)
+
     def test_show_mine_true(self):
         #  Values Dumped
         nonce_true = 4
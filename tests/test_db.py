@@ -1,5 +1,7 @@
 import unittest
 import os
+import shutil
+import tempfile
 
 from labchain.datastructure.blockchain import BlockChain
 from labchain.consensus.consensus import Consensus
@@ -13,12 +15,19 @@ from labchain.databaseInterface import Db
 class DbTestCase(unittest.TestCase):
 
     def setUp(self):
-        self.database = Db(block_chain_db_file=os.path.abspath(os.path.join(os.path.dirname(__file__),
-                                                                            '../labchain/resources/labchaindb.sqlite')))
+        # each test gets an empty database, none is left in the tree
+        self.temporary_dir = tempfile.mkdtemp()
+        self.database = Db(block_chain_db_file=os.path.join(self.temporary_dir,
+                                                            'labchaindb.sqlite'))
+        self.database.create_tables()
+        self.database.open_connection(self.database.db_file)
         self.init_components()
         self.create_transactions()
         self.create_blocks()
 
+    def tearDown(self):
+        shutil.rmtree(self.temporary_dir)
+
     def test_create_tables(self):
         self.assertTrue(self.database.create_tables())
 
@@ -26,6 +35,36 @@ class DbTestCase(unittest.TestCase):
         self.assertTrue(self.database.save_block(self.block1))
         self.database.get_blockchain_from_db()
 
+    def test_get_blockchain_from_db_after_block_id(self):
+        self.assertTrue(self.database.save_block(self.block1))
+        blocks = self.database.get_blockchain_from_db(self.block1.block_id - 1)
+        self.assertEqual([b.merkle_tree_root for b in blocks], [self.block1.merkle_tree_root])
+        self.assertIsNone(self.database.get_blockchain_from_db(self.block1.block_id))
+
+    def test_get_block_by_hash(self):
+        self.database.create_tables()
+        self.database.save_block(self.block2)
+        block = self.database.get_block_by_hash(self.block2.get_computed_hash())
+        self.assertEqual(block.merkle_tree_root, self.block2.merkle_tree_root)
+        self.assertEqual(block.block_id, self.block2.block_id)
+        self.assertEqual([t.transaction_hash for t in block.transactions],
+                         [self.txn3.transaction_hash, self.txn4.transaction_hash])
+        self.assertIsNone(self.database.get_block_by_hash("unknown"))
+
+    def test_save_blocks(self):
+        self.database.create_tables()
+        self.assertTrue(self.database.save_blocks([self.block1, self.block2]))
+        self.assertIsNotNone(self.database.get_block_by_hash(self.block2.get_computed_hash()))
+        # all blocks are rejected if one of them can not be saved
+        self.assertFalse(self.database.save_blocks([self.block7, self.block1]))
+        self.assertIsNone(self.database.get_block_by_hash(self.block7.get_computed_hash()))
+        # a block failing on its transactions leaves no row behind
+        self.assertFalse(self.database.save_block(self.block7))
+        self.assertIsNone(self.database.get_block_by_hash(self.block7.get_computed_hash()))
+        empty_block = self.blockchain.create_block([])
+        self.assertTrue(self.database.save_block(empty_block))
+        self.assertIsNotNone(self.database.get_block_by_hash(empty_block.get_computed_hash()))
+
     def init_components(self):
         node_config = './labchain/resources/node_configuration.ini'
         config_reader = ConfigReader(node_config)
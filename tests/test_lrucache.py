@@ -0,0 +1,29 @@
+import unittest
+
+from labchain.util.lruCache import LRUCache
+
+
+class LRUCacheTestCase(unittest.TestCase):
+    """Class of testcases for the LRUCache module"""
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+        cache.put('c', 3)
+        self.assertIn('a', cache)
+        self.assertNotIn('b', cache)
+        self.assertEqual(len(cache), 2)
+
+    def test_remove(self):
+        cache = LRUCache(2)
+        cache.put('a', 1)
+        cache.remove('a')
+        cache.remove('b')
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.get('a', 0), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+
+from labchain.datastructure.merkle import MerkleAccumulator, MerkleTree, hash_pair
+
+
+class MerkleTreeTestCase(unittest.TestCase):
+
+    def test_root(self):
+        self.assertIsNone(MerkleTree([]).get_root())
+        self.assertEqual(MerkleTree(['a']).get_root(), 'a')
+        # the last hash of an odd level is promoted unchanged
+        self.assertEqual(MerkleTree(['a', 'b', 'c']).get_root(),
+                         hash_pair(hash_pair('a', 'b'), 'c'))
+        self.assertEqual(MerkleTree(['a', 'b', 'c', 'd', 'e']).get_root(),
+                         hash_pair(hash_pair(hash_pair('a', 'b'), hash_pair('c', 'd')), 'e'))
+
+    def test_proofs(self):
+        for num_of_leaves in range(1, 12):
+            leaves = [str(i) for i in range(num_of_leaves)]
+            tree = MerkleTree(leaves)
+            root = tree.get_root()
+            for index, leaf in enumerate(leaves):
+                proof = tree.get_proof(index)
+                self.assertTrue(MerkleTree.verify_proof(leaf, proof, root))
+                self.assertFalse(MerkleTree.verify_proof('x', proof, root))
+        with self.assertRaises(IndexError):
+            MerkleTree(['a']).get_proof(1)
+
+    def test_verify_malformed_proof(self):
+        tree = MerkleTree(['a', 'b'])
+        self.assertFalse(MerkleTree.verify_proof('a', [{'hash': 'b', 'position': 'up'}], tree.get_root()))
+        self.assertFalse(MerkleTree.verify_proof('a', [{'position': 'right'}], tree.get_root()))
+
+
+class MerkleAccumulatorTestCase(unittest.TestCase):
+
+    def test_root_matches_tree(self):
+        accumulator = MerkleAccumulator()
+        self.assertIsNone(accumulator.get_root())
+        leaves = []
+        for i in range(20):
+            leaves.append(str(i))
+            accumulator.append(str(i))
+            self.assertEqual(accumulator.get_root(), MerkleTree(leaves).get_root())
+        self.assertEqual(len(accumulator), 20)
+        self.assertEqual(MerkleAccumulator(leaves).get_root(), accumulator.get_root())
+
+
+if __name__ == '__main__':
+    unittest.main()
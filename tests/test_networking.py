@@ -2,11 +2,13 @@
 import json
 import time
 from unittest import TestCase
+from unittest.mock import Mock, patch
 
 from werkzeug.test import Client
 
 from labchain.datastructure.block import Block
-from labchain.network.networking import ServerNetworkInterface, TransactionDoesNotExistException, BlockDoesNotExistException
+from labchain.network.networking import ServerNetworkInterface, TransactionDoesNotExistException, BlockDoesNotExistException, \
+    MAX_TRANSACTIONS_PAGE_SIZE, JsonRpcClient, UnexpectedResponseException
 from labchain.datastructure.transaction import Transaction
 
 
@@ -229,6 +231,39 @@ class SendTransactionTestCase(CommonTestCase):
         # assert response
         self.assert_json_equal(response, '{"jsonrpc": "2.0", "result": null, "id": 1}')
 
+    def test_send_transactions_to_admission_pipeline(self):
+        # given
+        submitted = []
+
+        def submit(transaction):
+            submitted.append(transaction)
+            return len(submitted) < 3
+        self.network_interface.submit_transaction_callback = submit
+        transaction = {"sender": "test_sender", "receiver": "test_receiver",
+                       "payload": "test_payload", "signature": "test_signature"}
+        # when
+        response = self.make_request(json.dumps({"jsonrpc": "2.0", "method": "sendTransaction",
+                                                 "params": [transaction], "id": 1}))
+        # then
+        self.assert_json_equal(response, {"jsonrpc": "2.0", "result": True, "id": 1})
+        response = self.make_request(json.dumps({"jsonrpc": "2.0", "method": "sendTransactions",
+                                                 "params": [[transaction, transaction]], "id": 2}))
+        self.assert_json_equal(response, {"jsonrpc": "2.0", "result": 1, "id": 2})
+        self.assertEqual([t.payload for t in submitted], ['test_payload'] * 3)
+        self.assertEqual(self.received_transactions, [])
+
+    def test_send_transactions_client(self):
+        # given
+        self.add_peer('192.168.2.3', 6666)
+        transactions = [Transaction('test_sender', 'test_receiver', str(i), 'test_signature') for i in range(2)]
+        # when
+        self.json_rpc_client.queue_response({'jsonrpc': '2.0', 'result': 2, 'id': 1})
+        self.network_interface.sendTransactions(transactions)
+        # then
+        last_request_method, last_request_params = self.get_last_request('192.168.2.3', 6666)
+        self.assertEqual(last_request_method, 'sendTransactions')
+        self.assertEqual(last_request_params, [[t.to_dict() for t in transactions]])
+
 
 def test_send_transaction_client_valid(self):
     """Test Case #6"""
@@ -338,6 +373,21 @@ class RequestTransactionServerTestCase(CommonTestCase):
         # then
         self.assert_json_equal(response, '{ "jsonrpc": "2.0", "result": null, "id": 1}')
 
+    def test_request_transaction_received_page(self):
+        # given
+        transactions = [Transaction("test_sender", "test_receiver", str(i), "test_signature") for i in range(3)]
+        self.network_interface.get_transaction_received_callback = \
+            lambda public_key, offset, limit: transactions[offset:offset + limit] \
+            if public_key == "test_receiver" else []
+        # when
+        json_rpc_request = {"jsonrpc": "2.0", "method": "requestTransactionReceived",
+                            "params": ["test_receiver", 1, 1], "id": 1}
+        response = self.make_request(json.dumps(json_rpc_request))
+        # then
+        self.assert_json_equal(response,
+                               '{"result": [{"sender": "test_sender", "receiver": "test_receiver", '
+                               '"payload": "1", "signature": "test_signature"}], "id": 1,"jsonrpc": "2.0"}')
+
 
 class RequestTransactionClientTestCase(CommonTestCase):
     def test_request_transaction(self):
@@ -363,6 +413,28 @@ class RequestTransactionClientTestCase(CommonTestCase):
         self.assertEqual(transaction.payload, 'test_payload')
         self.assertEqual(transaction.signature, 'test_signature')
 
+    def test_iter_all_transactions(self):
+        # given
+        self.add_peer('192.168.100.4', 6666)
+        transaction = {'sender': 'test_sender', 'receiver': 'test_receiver',
+                       'payload': 'test_payload', 'signature': 'test_signature'}
+        # responses are returned last queued first
+        self.json_rpc_client.queue_response({'jsonrpc': '2.0',
+                                             'result': {'transactions': [transaction], 'cursor': None},
+                                             'id': 2})
+        self.json_rpc_client.queue_response({'jsonrpc': '2.0',
+                                             'result': {'transactions': [transaction, transaction],
+                                                        'cursor': [3, 0]},
+                                             'id': 1})
+        # when
+        transactions = list(self.network_interface.iterAllTransactions(page_size=2))
+        # then
+        self.assertEqual(len(transactions), 3)
+        self.assertEqual(transactions[2].payload, 'test_payload')
+        requests = self.json_rpc_client.requests['192.168.100.4:6666']
+        self.assertEqual(requests, [('requestTransactionsPage', [None, 2]),
+                                    ('requestTransactionsPage', [[3, 0], 2])])
+
     def test_request_nonexistent_transaction(self):
         """test case #12 """
         # given
@@ -416,6 +488,56 @@ class RequestBlockServerTestCase(CommonTestCase):
                                          '"payload": "test_payload", "signature": "test_signature"}]}, "id":1}'
                                )
 
+    def test_request_block_by_hash_serialized(self):
+        # given
+        block = Block(2, 'test_merkle_hash', 'test_pred_block_hash', 'test_creator', [], nonce=5, timestamp=1337.0)
+        self.network_interface.get_block_json_by_hash_callback = \
+            lambda block_hash: block.get_json() if block_hash == 'test_block_hash' else None
+        # when
+        json_rpc_request = {"jsonrpc": "2.0", "method": "requestBlockByHash", "params": ['test_block_hash'],
+                            "id": 7}
+        response = self.make_request(json.dumps(json_rpc_request))
+        # then
+        self.assert_json_equal(response, {"jsonrpc": "2.0", "result": block.to_dict(), "id": 7})
+        # unknown blocks are answered by the regular handler
+        json_rpc_request['params'] = ['unknown_hash']
+        response = self.make_request(json.dumps(json_rpc_request))
+        self.assert_json_equal(response, '{ "jsonrpc": "2.0", "result": [], "id": 7}')
+
+    def test_request_merkle_proof(self):
+        # given
+        proof = {'blockHash': 'test_block_hash', 'merkleHash': 'test_merkle_hash',
+                 'transactionHash': 'test_hash', 'proof': [{'hash': 'test_sibling', 'position': 'left'}]}
+        self.network_interface.get_merkle_proof_callback = \
+            lambda transaction_hash: proof if transaction_hash == 'test_hash' else None
+        # when
+        json_rpc_request = {"jsonrpc": "2.0", "method": "requestMerkleProof", "params": ['test_hash'],
+                            "id": 1}
+        response = self.make_request(json.dumps(json_rpc_request))
+        # then
+        self.assert_json_equal(response, {"jsonrpc": "2.0", "result": proof, "id": 1})
+        json_rpc_request['params'] = ['unknown_hash']
+        response = self.make_request(json.dumps(json_rpc_request))
+        self.assert_json_equal(response, '{ "jsonrpc": "2.0", "result": null, "id": 1}')
+
+    def test_request_transactions_page(self):
+        # given
+        transaction = Transaction('test_sender', 'test_receiver', 'test_payload', 'test_signature')
+        pages = []
+
+        def get_transactions_page(cursor, limit):
+            pages.append((cursor, limit))
+            return [transaction], [2, 1]
+        self.network_interface.get_transactions_page_callback = get_transactions_page
+        # when
+        json_rpc_request = {"jsonrpc": "2.0", "method": "requestTransactionsPage", "params": [[1, 0], 10 ** 6],
+                            "id": 1}
+        response = self.make_request(json.dumps(json_rpc_request))
+        # then
+        self.assert_json_equal(response, {"jsonrpc": "2.0", "id": 1,
+                                          "result": {"transactions": [transaction.to_dict()], "cursor": [2, 1]}})
+        self.assertEqual(pages, [([1, 0], MAX_TRANSACTIONS_PAGE_SIZE)])
+
     def test_request_block_with_no_predecessor(self):
         """Test case #14."""
         # given
@@ -596,3 +718,15 @@ class RequestBlockClientTestCase(CommonTestCase):
         self.assertEqual(transaction.receiver, 'test_receiver')
         self.assertEqual(transaction.payload, 'test_payload')
         self.assertEqual(transaction.signature, 'test_signature')
+
+
+class JsonRpcClientTestCase(TestCase):
+
+    def test_invalid_response(self):
+        """Test that peers are called with a timeout and invalid JSON is reported"""
+        response = Mock()
+        response.json = Mock(side_effect=ValueError('No JSON object could be decoded'))
+        with patch('labchain.network.networking.requests.post', return_value=response) as post:
+            with self.assertRaises(UnexpectedResponseException):
+                JsonRpcClient(timeout=5).send('127.0.0.1', 6666, 'getPeers')
+        self.assertEqual(post.call_args[1]['timeout'], 5)
@@ -0,0 +1,57 @@
+import unittest
+
+from labchain.datastructure.block import LogicalBlock
+from labchain.datastructure.orphanpool import OrphanPool
+
+
+class OrphanPoolTestCase(unittest.TestCase):
+    """Class of testcases for the OrphanPool module"""
+
+    def setUp(self):
+        self.orphan_pool = OrphanPool(max_size=3, pruning_interval=60)
+        self.blocks = [LogicalBlock(block_id=2, transactions=[], predecessor_hash='parent',
+                                    block_creator_id='creator', nonce=nonce)
+                       for nonce in range(4)]
+        # fixed hashes, the pool does not depend on how blocks are hashed
+        self.hashes = ['orphan{}'.format(nonce) for nonce in range(4)]
+
+    def add_block(self, index, arrival_time):
+        return self.orphan_pool.add(self.hashes[index], self.blocks[index], arrival_time)
+
+    def test_multiple_children_per_parent(self):
+        """Test that orphans sharing a predecessor are all kept"""
+        self.assertTrue(self.add_block(1, 20))
+        self.assertTrue(self.add_block(0, 10))
+        self.assertFalse(self.add_block(0, 30))
+        self.assertEqual(len(self.orphan_pool), 2)
+        self.assertEqual(self.orphan_pool.pop_children('parent'), self.blocks[:2])
+        self.assertEqual(len(self.orphan_pool), 0)
+        self.assertEqual(self.orphan_pool.pop_children('parent'), [])
+
+    def test_eviction_when_full(self):
+        """Test that the oldest orphan is evicted when the pool is full"""
+        for index in range(len(self.blocks)):
+            self.add_block(index, index)
+        self.assertEqual(len(self.orphan_pool), 3)
+        self.assertNotIn(self.hashes[0], self.orphan_pool)
+        self.assertIn(self.hashes[3], self.orphan_pool)
+
+    def test_zero_max_size(self):
+        """Test that a pool configured with size 0 keeps the latest orphan"""
+        self.orphan_pool = OrphanPool(max_size=0, pruning_interval=60)
+        self.assertTrue(self.add_block(0, 0))
+        self.assertTrue(self.add_block(1, 1))
+        self.assertEqual(len(self.orphan_pool), 1)
+        self.assertIn(self.hashes[1], self.orphan_pool)
+
+    def test_prune(self):
+        """Test that only orphans older than the pruning interval are pruned"""
+        self.add_block(0, 0)
+        self.add_block(1, 50)
+        self.assertEqual(self.orphan_pool.prune(current_time=70), 1)
+        self.assertNotIn(self.hashes[0], self.orphan_pool)
+        self.assertIn(self.hashes[1], self.orphan_pool)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+
+from labchain.util.ringBuffer import RingBuffer
+
+
+class RingBufferTestCase(unittest.TestCase):
+    """Class of testcases for the RingBuffer module"""
+
+    def test_overwrites_oldest(self):
+        buffer = RingBuffer(3)
+        buffer.extend([1, 2])
+        self.assertEqual(buffer.latest(5), [2, 1])
+        buffer.extend([3, 4, 5])
+        self.assertEqual(len(buffer), 3)
+        self.assertEqual(buffer.latest(3), [5, 4, 3])
+        self.assertEqual(buffer.latest(1), [5])
+        self.assertEqual(buffer.latest(0), [])
+
+    def test_extend_is_atomic(self):
+        buffer = RingBuffer(100)
+        seen = []
+        original_append = buffer._append
+
+        def append(item):
+            # a reader between two items must wait for the whole extend
+            original_append(item)
+            acquired = buffer._lock.acquire(blocking=False)
+            if acquired:
+                buffer._lock.release()
+            seen.append(acquired)
+
+        buffer._append = append
+        buffer.extend([1, 2, 3])
+        self.assertEqual(seen, [False, False, False])
+        self.assertEqual(buffer.latest(3), [3, 2, 1])
+
+    def test_clear_and_zero_capacity(self):
+        buffer = RingBuffer(2)
+        buffer.extend([1, 2, 3])
+        buffer.clear()
+        self.assertEqual(buffer.latest(2), [])
+        buffer.append(4)
+        self.assertEqual(buffer.latest(2), [4])
+        empty = RingBuffer(0)
+        empty.append(1)
+        self.assertEqual(len(empty), 0)
+        self.assertEqual(empty.latest(1), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
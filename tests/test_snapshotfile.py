@@ -0,0 +1,39 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from labchain.util.snapshotFile import SnapshotFile
+
+
+class SnapshotFileTestCase(unittest.TestCase):
+    """Class of testcases for the SnapshotFile module"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'snapshot.bin')
+        self.snapshot_file = SnapshotFile(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_save_and_load(self):
+        self.assertIsNone(self.snapshot_file.load())
+        self.assertTrue(self.snapshot_file.save(b'state 1'))
+        self.assertTrue(self.snapshot_file.save(b'state 2'))
+        self.assertEqual(self.snapshot_file.load(), b'state 2')
+        self.assertEqual(os.listdir(self.directory), ['snapshot.bin'])
+
+    def test_corrupted_snapshot(self):
+        self.snapshot_file.save(b'state')
+        with open(self.path, 'r+b') as f:
+            f.seek(-1, os.SEEK_END)
+            f.write(b'X')
+        self.assertIsNone(self.snapshot_file.load())
+        with open(self.path, 'wb') as f:
+            f.write(b'unknown')
+        self.assertIsNone(self.snapshot_file.load())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -41,6 +41,25 @@ class TransactionTestCase(unittest.TestCase):
         except ValueError:
             self.assertTrue(True)
 
+    def test_hash_without_transaction_hash(self):
+        """Test that transactions are hashable before their hash is computed"""
+        transaction = Transaction(sender="s", receiver="r", payload="1")
+        transaction.signature = "sig"
+        same = Transaction.from_json(transaction.get_json())
+        other = Transaction(sender="s", receiver="r", payload="2", signature="sig")
+        self.assertIsNone(transaction.transaction_hash)
+        self.assertEqual(hash(transaction), hash(same))
+        self.assertEqual(1, len({transaction, same}))
+        self.assertEqual(2, len({transaction, other}))
+
+    def test_cached_json(self):
+        """Test that the cached JSON reflects the signature once it is set"""
+        transaction = Transaction(sender="s", receiver="r", payload="1")
+        self.assertIsNone(Transaction.from_json(transaction.get_json()).signature)
+        transaction.signature = "sig"
+        self.assertEqual("sig", Transaction.from_json(transaction.get_json()).signature)
+        self.assertIs(transaction.get_json(), transaction.get_json())
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,4 +1,5 @@
 import unittest
+from unittest.mock import Mock
 
 
 from labchain.datastructure.txpool import TxPool
@@ -54,6 +55,116 @@ class TxPoolTestCase(unittest.TestCase):
         transactions = self._txPoolObj.get_transactions(tx_pool_count)
         self.assertFalse(transaction in transactions)
 
+    def test_get_transaction_by_hash(self):
+        """Test lookup of pool transactions by their hash"""
+        transaction = Transaction(self.private_key, self.public_key, "k")
+        self._txPoolObj.add_transaction_if_not_exist(transaction)
+        self.assertEqual(self._txPoolObj.get_transaction_by_hash(transaction.transaction_hash),
+                         (transaction, None))
+        self._txPoolObj.remove_transaction(transaction)
+        self.assertEqual(self._txPoolObj.get_transaction_by_hash(transaction.transaction_hash),
+                         (None, None))
+
+    def test_insertion_order_and_duplicates(self):
+        """Test that batches are taken oldest first and duplicates rejected"""
+        self._txPoolObj.get_transactions(self._txPoolObj.get_transaction_count())
+        transactions = [Transaction(self.private_key, self.public_key, str(i)) for i in range(5)]
+        self._txPoolObj.return_transactions_to_pool(transactions)
+        self.assertFalse(self._txPoolObj.add_transaction_if_not_exist(transactions[2]))
+        self.assertEqual(self._txPoolObj.get_transactions(2, False), transactions[:2])
+        self.assertEqual(self._txPoolObj.get_transaction_count(), 5)
+        self.assertTrue(self._txPoolObj.remove_transaction(transactions[1]))
+        self.assertFalse(self._txPoolObj.remove_transaction(transactions[1]))
+        self.assertEqual(self._txPoolObj.get_transactions(3), [transactions[0], transactions[2], transactions[3]])
+        self.assertEqual(self._txPoolObj.get_transactions(3), [transactions[4]])
+
+    def test_priority_order(self):
+        """Test that transactions with a higher fee are taken first"""
+        self._txPoolObj.get_transactions(self._txPoolObj.get_transaction_count())
+        low = Transaction(self.private_key, self.public_key, "low")
+        high = Transaction(self.private_key, self.public_key, '{"fee": 5}')
+        medium = Transaction(self.private_key, self.public_key, '{"fee": 2}')
+        self._txPoolObj.return_transactions_to_pool([low, high, medium])
+        self.assertEqual(TxPool.get_priority(medium), 2)
+        self.assertEqual(self._txPoolObj.get_transactions(3, False), [high, medium, low])
+        self.assertEqual(self._txPoolObj.get_transactions(2), [high, medium])
+        self.assertEqual(self._txPoolObj.get_transactions(2), [low])
+
+    def test_eviction(self):
+        """Test that the lowest priority transactions are evicted when full"""
+        self._txPoolObj.get_transactions(self._txPoolObj.get_transaction_count())
+        transactions = [Transaction(self.private_key, self.public_key, '{"fee": %d}' % fee)
+                        for fee in (1, 3, 2, 5)]
+        try:
+            self._txPoolObj.set_limits(max_transactions=2)
+            self.assertTrue(self._txPoolObj.add_transaction_if_not_exist(transactions[0]))
+            self.assertTrue(self._txPoolObj.add_transaction_if_not_exist(transactions[1]))
+            self.assertTrue(self._txPoolObj.add_transaction_if_not_exist(transactions[2]))
+            self.assertIsNone(self._txPoolObj.get_transaction_by_hash(transactions[0].transaction_hash)[0])
+            self.assertFalse(self._txPoolObj.add_transaction_if_not_exist(
+                Transaction(self.private_key, self.public_key, '{"fee": 2}')))
+            self.assertTrue(self._txPoolObj.add_transaction_if_not_exist(transactions[3]))
+            self.assertEqual(self._txPoolObj.get_transactions(2, False), [transactions[3], transactions[1]])
+
+            size = len(transactions[3].get_json())
+            self._txPoolObj.set_limits(max_bytes=size)
+            self.assertEqual(self._txPoolObj.get_transactions(2, False), [transactions[3]])
+            self.assertEqual(self._txPoolObj.get_size_in_bytes(), size)
+
+            # nothing fits into a pool without room
+            self._txPoolObj.set_limits(max_transactions=0)
+            self.assertEqual(self._txPoolObj.get_transaction_count(), 0)
+            self.assertFalse(self._txPoolObj.add_transaction_if_not_exist(transactions[0]))
+        finally:
+            self._txPoolObj.set_limits()
+
+    def test_round_robin(self):
+        """Test that blocks are filled from all senders in turn"""
+        self._txPoolObj.get_transactions(self._txPoolObj.get_transaction_count())
+        hot = [Transaction("hot", self.public_key, str(i)) for i in range(4)]
+        other = Transaction("other", self.public_key, "1")
+        rich = Transaction("rich", self.public_key, '{"fee": 1}')
+        self._txPoolObj.return_transactions_to_pool(hot + [other, rich])
+        self.assertEqual(self._txPoolObj.get_transactions_round_robin(4),
+                         [rich, hot[0], other, hot[1]])
+        self.assertEqual(self._txPoolObj.get_transactions_round_robin(4), [hot[2], hot[3]])
+        self.assertEqual(self._txPoolObj.get_transaction_count(), 0)
+
+    def test_limit_per_sender(self):
+        """Test that the transactions of a single sender are limited"""
+        self._txPoolObj.get_transactions(self._txPoolObj.get_transaction_count())
+        hot = [Transaction("hot", self.public_key, '{"fee": %d}' % fee) for fee in (1, 2, 3)]
+        try:
+            self._txPoolObj.return_transactions_to_pool(hot)
+            self._txPoolObj.set_limits(max_per_sender=2)
+            self.assertEqual(self._txPoolObj.get_transactions(3, False), [hot[2], hot[1]])
+            self.assertFalse(self._txPoolObj.add_transaction_if_not_exist(
+                Transaction("hot", self.public_key, "4")))
+            self.assertTrue(self._txPoolObj.add_transaction_if_not_exist(
+                Transaction("other", self.public_key, "4")))
+
+            # rejected transactions do not stop the others from returning
+            returned = [Transaction("hot", self.public_key, "5"),
+                        Transaction("other", self.public_key, "5")]
+            self.assertFalse(self._txPoolObj.return_transactions_to_pool(returned))
+            self.assertEqual(self._txPoolObj.get_transaction_by_hash(
+                returned[1].transaction_hash)[0], returned[1])
+        finally:
+            self._txPoolObj.set_limits()
+
+    def test_add_transactions(self):
+        """Test adding several transactions with their signatures verified together"""
+        existing = Transaction(self.private_key, self.public_key, "existing")
+        self._txPoolObj.add_transaction_if_not_exist(existing)
+        transactions = [Transaction(self.private_key, self.public_key, str(i)) for i in range(3)]
+        engine = Mock()
+        engine.verify_transactions = Mock(return_value=[True, False, True])
+        added = self._txPoolObj.add_transactions([existing] + transactions + [transactions[0]], engine)
+        engine.verify_transactions.assert_called_once_with(transactions)
+        self.assertEqual(added, [transactions[0], transactions[2]])
+        self.assertIsNone(self._txPoolObj.get_transaction_by_hash(transactions[1].transaction_hash)[0])
+        self.assertEqual(self._txPoolObj.add_transactions([transactions[0]]), [])
+
     def test_return_transactions_to_pool(self):
         """Test for return transactions to pool"""
         transactions = [Transaction(self.private_key, self.public_key, "h"), Transaction(self.private_key, self.public_key, "i"), Transaction(self.private_key, self.public_key, "j")]
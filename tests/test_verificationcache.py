@@ -0,0 +1,47 @@
+import unittest
+from unittest.mock import Mock
+
+from labchain.datastructure.transaction import Transaction
+from labchain.util.verificationCache import VerificationCache, DEFAULT_CACHE_SIZE
+
+
+class VerificationCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = VerificationCache.instance()
+        self.cache.set_max_size(2)
+        self.crypto_helper = Mock()
+        self.crypto_helper.hash = Mock(side_effect=lambda data: str(hash(data)))
+
+    def tearDown(self):
+        self.cache.set_max_size(DEFAULT_CACHE_SIZE)
+
+    def test_signature_verified_once(self):
+        self.crypto_helper.validate = Mock(return_value=True)
+        transaction = Transaction("sender", "receiver", "payload", "signature")
+        hits = self.cache.get_stats()['hits']
+        self.assertTrue(transaction.validate_transaction(self.crypto_helper))
+        self.assertTrue(transaction.validate_transaction(self.crypto_helper))
+        self.assertEqual(self.crypto_helper.validate.call_count, 1)
+        self.assertEqual(self.cache.get_stats()['hits'], hits + 1)
+        self.assertTrue(self.cache.is_verified(transaction.transaction_hash, "signature"))
+        self.assertFalse(self.cache.is_verified(transaction.transaction_hash, "other"))
+
+    def test_invalid_signature_not_cached(self):
+        self.crypto_helper.validate = Mock(return_value=False)
+        transaction = Transaction("sender", "receiver", "payload2", "signature")
+        self.assertFalse(transaction.validate_transaction(self.crypto_helper))
+        self.assertFalse(transaction.validate_transaction(self.crypto_helper))
+        self.assertEqual(self.crypto_helper.validate.call_count, 2)
+        self.assertEqual(self.cache.get_stats()['size'], 0)
+
+    def test_cache_bounded(self):
+        for i in range(3):
+            self.cache.add(str(i), "signature")
+        self.assertEqual(self.cache.get_stats()['size'], 2)
+        self.assertFalse(self.cache.is_verified("0", "signature"))
+        self.assertTrue(self.cache.is_verified("2", "signature"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+
+from labchain.datastructure.block import LogicalBlock
+from labchain.datastructure.transaction import Transaction
+from labchain.util.cryptoHelper import CryptoHelper
+from labchain.util.verificationEngine import VerificationEngine
+
+
+class VerificationEngineTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.crypto_helper = CryptoHelper.instance()
+        pr_key1, pub_key1 = self.crypto_helper.generate_key_pair()
+        pr_key2, pub_key2 = self.crypto_helper.generate_key_pair()
+        self.transactions = []
+        for i in range(6):
+            transaction = Transaction(pub_key1, pub_key2, "Payload" + str(i))
+            transaction.sign_transaction(self.crypto_helper, pr_key1)
+            self.transactions.append(transaction)
+        # signed by a different key than the one of the sender
+        self.invalid_transaction = Transaction(pub_key1, pub_key2, "Payload")
+        self.invalid_transaction.sign_transaction(self.crypto_helper, pr_key2)
+        self.engine = VerificationEngine(num_of_workers=2, min_parallel_transactions=4)
+
+    def tearDown(self):
+        self.engine.shutdown()
+
+    def test_verify_transactions(self):
+        # small batches are verified in the calling thread
+        self.assertEqual(self.engine.verify_transactions(self.transactions[:2]), [True, True])
+        self.assertIsNone(self.engine._executor)
+
+        transactions = self.transactions + [self.invalid_transaction]
+        self.assertEqual(self.engine.verify_transactions(transactions),
+                         [True] * 6 + [False])
+        self.assertIsNotNone(self.engine._executor)
+
+    def test_start(self):
+        self.engine.start()
+        executor = self.engine._executor
+        self.assertEqual(executor._mp_context.get_start_method(), 'spawn')
+        self.assertEqual(self.engine.verify_transactions(self.transactions), [True] * 6)
+        self.assertIs(self.engine._executor, executor)
+        self.engine.shutdown()
+        self.assertIsNone(self.engine._executor)
+
+    def test_verify_blocks(self):
+        block1 = LogicalBlock(block_id=1, transactions=self.transactions[:3])
+        block2 = LogicalBlock(block_id=2, transactions=[self.invalid_transaction])
+        block3 = LogicalBlock(block_id=3, transactions=[])
+        block4 = LogicalBlock(block_id=4, transactions=self.transactions[3:])
+        self.assertEqual(self.engine.verify_blocks([block1, block2, block3, block4]),
+                         [True, False, True, True])
+        self.assertEqual(block2.validate_block(0, 0, 1, 1, self.engine), -1)
+
+
+if __name__ == '__main__':
+    unittest.main()